@@ -0,0 +1,210 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL,
+        accessed REAL NOT NULL
+    ) WITHOUT ROWID""",
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+)
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+)
+INT_RANGE = range(-2 ** 63, 2 ** 63)
+# Чаще, чем раз в ACCESS_RESOLUTION секунд, время доступа не обновляется:
+# иначе каждое чтение было бы записью.
+ACCESS_RESOLUTION = 1.0
+# COUNT(*) проходит всю таблицу, поэтому размер проверяется не на каждой
+# записи, а раз в CULL_INTERVAL записей соединения.
+CULL_INTERVAL = 100
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов на машине.
+
+    LOCATION -- путь к файлу. Значения хранятся в pickle, целые числа --
+    как INTEGER. Изменяющие операции идут под блокировкой записи
+    (BEGIN IMMEDIATE), поэтому add() и incr() атомарны между процессами.
+    Записи с истёкшим TTL не отдаются и удаляются при записи; при
+    переполнении (MAX_ENTRIES) вытесняются давно не читанные (LRU);
+    переполнение проверяется раз в CULL_INTERVAL записей (OPTIONS).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._local = threading.local()
+        self._cull_interval = params.get('OPTIONS', {}).get(
+            'CULL_INTERVAL', CULL_INTERVAL)
+
+    @property
+    def db(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = self._connect()
+            local.pid = os.getpid()
+            local.writes = 0
+        return local.connection
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self.path, timeout=5, isolation_level=None,
+            check_same_thread=False)
+        for sql in PRAGMAS + SCHEMA:
+            connection.execute(sql)
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int and value in INT_RANGE:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _row(self, db, key, now):
+        row = db.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?',
+            (key,)).fetchone()
+        if row is not None and row[1] is not None and row[1] <= now:
+            return None
+        return row
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        row = self._row(self.db, key, now)
+        if row is None:
+            return default
+        if row[2] < now - ACCESS_RESOLUTION:
+            self.db.execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return self._decode(row[0])
+
+    def get_many(self, keys, version=None):
+        found = {}
+        for key in keys:
+            value = self.get(key, self, version)
+            if value is not self:
+                found[key] = value
+        return found
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._row(self.db, key, time.time()) is not None
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = [
+            (self._key(key, version), self._encode(value), expires, now)
+            for key, value in data.items()
+        ]
+        with self._transaction() as db:
+            db.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)', rows)
+            self._cull(db, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        with self._transaction() as db:
+            if self._row(db, key, now) is not None:
+                return False
+            db.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                       (key, self._encode(value), expires, now))
+            self._cull(db, now)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        with self._transaction() as db:
+            if self._row(db, key, now) is None:
+                return False
+            db.execute('UPDATE cache SET expires = ? WHERE key = ?',
+                       (expires, key))
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._transaction() as db:
+            row = self._row(db, key, time.time())
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = self._decode(row[0]) + delta
+            db.execute('UPDATE cache SET value = ? WHERE key = ?',
+                       (self._encode(value), key))
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [(self._key(key, version),) for key in keys]
+        with self._transaction() as db:
+            db.executemany('DELETE FROM cache WHERE key = ?', keys)
+
+    def clear(self):
+        self.db.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение живёт всё время потока: переоткрывать файл на каждый
+        # запрос дороже, чем держать его открытым.
+        pass
+
+    def _cull(self, db, now):
+        local = self._local
+        local.writes += 1
+        if local.writes % self._cull_interval:
+            return
+        db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute('DELETE FROM cache')
+            return
+        excess = max(count - self._max_entries,
+                     count // self._cull_frequency)
+        db.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache ORDER BY accessed LIMIT ?)', (excess,))
@@ -0,0 +1,96 @@
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from .benchmark_sqlite import percentile
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'filebased': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.cache.SQLiteCache',
+}
+SHARED_KEY = 'benchmark:shared'
+
+
+def make_cache(name, directory):
+    location = os.path.join(directory, name)
+    if name == 'sqlite':
+        location += '.sqlite3'
+    return import_string(BACKENDS[name])(location, {
+        'OPTIONS': {'MAX_ENTRIES': 100000}})
+
+
+def run_worker(name, directory, operations, keys, value, seed):
+    """Смесь чтений, записей и incr: задержки в микросекундах и число incr."""
+    cache = make_cache(name, directory)
+    rng = random.Random(seed)
+    timings, increments = [], 0
+    for _ in range(operations):
+        key = f'page:{rng.randrange(keys)}'
+        roll = rng.random()
+        started = time.perf_counter()
+        if roll < 0.8:
+            cache.get(key)
+        elif roll < 0.95:
+            cache.set(key, value)
+        else:
+            cache.add(SHARED_KEY, 0)
+            cache.incr(SHARED_KEY)
+            increments += 1
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings, increments
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает кэши locmem, filebased и SQLite на нескольких '
+            'процессах и печатает отчёт в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--operations', type=int, default=5000,
+                            help='Операций на процесс.')
+        parser.add_argument('--keys', type=int, default=500)
+        parser.add_argument('--value-size', type=int, default=4096)
+        parser.add_argument('--backends', nargs='+', choices=list(BACKENDS),
+                            default=list(BACKENDS))
+        parser.add_argument('--output', help='Файл для отчёта.')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        value = 'x' * options['value_size']
+        report = {}
+        for name in options['backends']:
+            with tempfile.TemporaryDirectory() as directory:
+                jobs = [
+                    (name, directory, options['operations'],
+                     options['keys'], value, seed)
+                    for seed in range(options['workers'])
+                ]
+                started = time.perf_counter()
+                with context.Pool(options['workers']) as pool:
+                    results = pool.starmap(run_worker, jobs)
+                elapsed = time.perf_counter() - started
+                timings = [
+                    timing for result, _ in results for timing in result]
+                shared = make_cache(name, directory).get(SHARED_KEY) or 0
+            report[name] = {
+                'ops_per_sec': round(len(timings) / elapsed),
+                'p50_us': round(percentile(timings, 50), 1),
+                'p99_us': round(percentile(timings, 99), 1),
+                # Сколько incr из всех процессов видно из родительского:
+                # у locmem -- ноль, у общего кэша с атомарным incr -- все.
+                'incr_calls': sum(count for _, count in results),
+                'incr_seen': shared,
+            }
+
+        result = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(result)
+        self.stdout.write(result)
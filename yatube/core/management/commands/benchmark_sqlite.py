@@ -0,0 +1,111 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite import apply_pragmas
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, created REAL)',
+    'CREATE INDEX post_created ON post (created)',
+)
+WRITE_SQL = 'INSERT INTO post (text, created) VALUES (?, ?)'
+READ_SQL = 'SELECT id, text FROM post ORDER BY created DESC LIMIT 10'
+# Таймаут блокировки sqlite3 по умолчанию у Django.
+TIMEOUT = 5
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class Command(BaseCommand):
+    help = ('Замеряет запись и чтение SQLite из нескольких потоков без '
+            'профиля SQLITE_PRAGMAS и с ним и печатает отчёт в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=3)
+        parser.add_argument('--output', help='Файл для отчёта.')
+
+    def handle(self, *args, **options):
+        report = {
+            'default': self.run({}, options),
+            'profile': self.run(settings.SQLITE_PRAGMAS, options),
+        }
+        result = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(result)
+        self.stdout.write(result)
+
+    def run(self, pragmas, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            db = self.connect(path, pragmas)
+            for sql in SCHEMA:
+                db.execute(sql)
+            with db:
+                db.executemany(WRITE_SQL, (
+                    (f'пост {i}', time.time()) for i in range(1000)))
+            db.close()
+
+            deadline = time.monotonic() + options['seconds']
+            results = {'write': [], 'read': [], 'errors': []}
+            threads = [
+                threading.Thread(target=self.worker, args=(
+                    path, pragmas, deadline, kind, results))
+                for kind, count in (('write', options['writers']),
+                                    ('read', options['readers']))
+                for _ in range(count)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        seconds = options['seconds']
+        return {
+            'writes_per_sec': round(len(results['write']) / seconds),
+            'reads_per_sec': round(len(results['read']) / seconds),
+            'write_p99_ms': round(percentile(results['write'], 99), 3),
+            'read_p99_ms': round(percentile(results['read'], 99), 3),
+            'errors': len(results['errors']),
+        }
+
+    @staticmethod
+    def connect(path, pragmas):
+        db = sqlite3.connect(path, timeout=TIMEOUT, check_same_thread=False)
+        apply_pragmas(db, pragmas)
+        return db
+
+    def worker(self, path, pragmas, deadline, kind, results):
+        """Пишет по строке в транзакции (как add_comment) или читает ленту.
+
+        Списки общие для потоков: append в CPython атомарен.
+        """
+        db = self.connect(path, pragmas)
+        timings = results[kind]
+        try:
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    if kind == 'write':
+                        with db:
+                            db.execute(WRITE_SQL, ('новый пост', time.time()))
+                    else:
+                        db.execute(READ_SQL).fetchall()
+                except sqlite3.OperationalError as error:
+                    results['errors'].append(str(error))
+                    continue
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
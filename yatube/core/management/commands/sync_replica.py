@@ -0,0 +1,37 @@
+import os
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик из '
+            'DATABASE_REPLICAS (для проверки реплик локально).')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS пуст.')
+        for alias in settings.DATABASE_REPLICAS:
+            replica = settings.DATABASES[alias]
+            if not all('sqlite3' in db['ENGINE'] for db in (primary, replica)):
+                raise CommandError(f'{alias}: копируются только базы SQLite.')
+            self.copy(primary['NAME'], replica['NAME'])
+            self.stdout.write(f'{alias}: скопировано в {replica["NAME"]}')
+
+    @staticmethod
+    def copy(source, target):
+        """Согласованный снимок через backup API, подменяемый атомарно:
+        открытые соединения дочитывают старый файл, новые видят новый.
+        """
+        temporary = f'{target}.sync'
+        src, dst = sqlite3.connect(source), sqlite3.connect(temporary)
+        try:
+            src.backup(dst)
+            dst.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            src.close()
+            dst.close()
+        os.replace(temporary, target)
@@ -0,0 +1,177 @@
+import atexit
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+# Семейства метрик: тип, описание и границы корзин для гистограмм.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+METRICS = {
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время ответа по view.', LATENCY_BUCKETS),
+    'yatube_responses_total': (
+        'counter', 'Ответы по view и коду.', None),
+    'yatube_db_queries_per_request': (
+        'histogram', 'SQL-запросов на запрос.', QUERY_BUCKETS),
+    'yatube_db_duration_seconds': (
+        'histogram', 'Время SQL-запросов на запрос.', LATENCY_BUCKETS),
+    'yatube_cache_requests_total': (
+        'counter', 'Попадания и промахи кэша страниц и фрагментов.', None),
+    'yatube_thumbnail_duration_seconds': (
+        'histogram', 'Построение миниатюры и вариантов картинки.',
+        LATENCY_BUCKETS),
+    'yatube_template_render_seconds': (
+        'histogram', 'Рендер шаблона или тега за запрос.', LATENCY_BUCKETS),
+}
+# Сколько секунд ждать блокировку файла метрик, прежде чем отложить сброс.
+LOCK_TIMEOUT = 0.5
+BOUND = re.compile(r'(?:^|,)le="([^"]+)"')
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS metrics (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+) WITHOUT ROWID"""
+UPSERT_SQL = """INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?)
+    ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value"""
+
+logger = logging.getLogger(__name__)
+# Процесс копит приращения в памяти и сбрасывает их в общий файл
+# METRICS_DB не чаще раза в METRICS_FLUSH_INTERVAL секунд; /metrics
+# суммирует то, что записали все воркеры.
+_lock = threading.Lock()
+_pending = defaultdict(float)
+_state = {'flushed': 0.0, 'pid': None, 'path': None, 'db': None}
+
+
+def _labels(labels):
+    return ','.join(
+        f'{name}="{escape(value)}"' for name, value in sorted(labels.items()))
+
+
+def escape(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def inc(name, value=1, **labels):
+    if not settings.METRICS_ENABLED:
+        return
+    with _lock:
+        _pending[name, _labels(labels)] += value
+
+
+def observe(name, value, **labels):
+    """Значение в гистограмму name: корзины, сумма и счётчик."""
+    if not settings.METRICS_ENABLED:
+        return
+    buckets = METRICS[name][2]
+    with _lock:
+        for bound in buckets:
+            _pending[f'{name}_bucket',
+                     _labels({**labels, 'le': bound})] += value <= bound
+        _pending[f'{name}_bucket', _labels({**labels, 'le': '+Inf'})] += 1
+        _pending[f'{name}_sum', _labels(labels)] += value
+        _pending[f'{name}_count', _labels(labels)] += 1
+
+
+def _db():
+    path = settings.METRICS_DB
+    if (_state['pid'], _state['path']) != (os.getpid(), path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(path, timeout=LOCK_TIMEOUT,
+                             isolation_level=None, check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=OFF')
+        db.execute(SCHEMA)
+        _state.update(db=db, pid=os.getpid(), path=path)
+    return _state['db']
+
+
+def _write(rows):
+    db = _db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        db.executemany(UPSERT_SQL, rows)
+        db.execute('COMMIT')
+    except sqlite3.Error:
+        if db.in_transaction:
+            db.execute('ROLLBACK')
+        raise
+
+
+def flush(force=False):
+    """Складывает накопленное в METRICS_DB.
+
+    Если файл занят или недоступен, ошибка пишется в лог, а значения
+    остаются в памяти до следующей попытки: метрики не должны ронять
+    ответ.
+    """
+    with _lock:
+        now = time.monotonic()
+        if not _pending or not force and (
+            now - _state['flushed'] < settings.METRICS_FLUSH_INTERVAL
+        ):
+            return
+        _state['flushed'] = now
+        rows = [(name, labels, value)
+                for (name, labels), value in _pending.items()]
+        try:
+            _write(rows)
+        except (sqlite3.Error, OSError):
+            logger.exception('Не удалось сохранить метрики в %s',
+                             settings.METRICS_DB)
+            return
+        _pending.clear()
+
+
+# Остаток, не дождавшийся интервала, сбрасывается при остановке воркера.
+atexit.register(flush, force=True)
+
+
+def _order(row):
+    # Корзины гистограммы идут по возрастанию le, а не по строке.
+    name, labels, _ = row
+    match = BOUND.search(labels)
+    if match is None:
+        return name, labels, 0.0
+    return name, BOUND.sub('', labels), float(match.group(1))
+
+
+def render():
+    """Текстовый формат Prometheus по данным всех процессов."""
+    flush(force=True)
+    with _lock:
+        rows = _db().execute(
+            'SELECT name, labels, value FROM metrics').fetchall()
+    rows.sort(key=_order)
+    lines = []
+    for family, (kind, help_text, _) in METRICS.items():
+        samples = [row for row in rows if row[0] == family
+                   or row[0].startswith(f'{family}_')]
+        if not samples:
+            continue
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        for name, labels, value in samples:
+            labels = f'{{{labels}}}' if labels else ''
+            if value.is_integer():
+                value = int(value)
+            lines.append(f'{name}{labels} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Очищает накопленное (для тестов и ручного сброса)."""
+    with _lock:
+        _pending.clear()
+        _db().execute('DELETE FROM metrics')
@@ -0,0 +1,170 @@
+import cProfile
+import hmac
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, profiling, template_timing
+from .routers import replica_allowed, wrote
+
+STICKY_COOKIE = 'primary_db'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+
+class ReplicaRoutingMiddleware:
+    """Разрешает чтение с реплик в безопасных запросах без свежих записей.
+
+    Если запрос что-то записал, ответ ставит cookie на
+    REPLICA_STICKY_SECONDS: пока она жива, запросы этого клиента читают
+    с основной базы и не видят отставания реплики.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        allowed = replica_allowed.set(
+            request.method in SAFE_METHODS
+            and STICKY_COOKIE not in request.COOKIES)
+        written = wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if wrote.get():
+                response.set_cookie(
+                    STICKY_COOKIE, '1',
+                    max_age=settings.REPLICA_STICKY_SECONDS, httponly=True)
+        finally:
+            replica_allowed.reset(allowed)
+            wrote.reset(written)
+        return response
+
+
+class SamplingProfilerMiddleware:
+    """Профилирует cProfile долю PROFILER_SAMPLE_RATE запросов и запросы с
+    заголовком X-Profile, равным PROFILER_SECRET.
+
+    Профили пишутся по имени view в PROFILER_DIR, хранятся последние
+    PROFILER_MAX_FILES файлов. Если профилировать нечего, middleware
+    отключается при старте и ничего не стоит.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.PROFILER_SAMPLE_RATE or settings.PROFILER_SECRET):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def sampled(self, request):
+        secret = settings.PROFILER_SECRET
+        # Заголовки WSGI -- строки latin-1; compare_digest на str падает
+        # на не-ASCII символах, поэтому сравниваются байты.
+        if secret and hmac.compare_digest(
+            request.META.get(PROFILE_HEADER, '').encode('latin-1', 'replace'),
+            secret.encode('utf-8'),
+        ):
+            return True
+        return random.random() < settings.PROFILER_SAMPLE_RATE
+
+    def __call__(self, request):
+        if not self.sampled(request):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # В этом потоке уже работает другой профилировщик.
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        match = getattr(request, 'resolver_match', None)
+        profiling.save(
+            profiler, settings.PROFILER_DIR,
+            match.view_name if match else None,
+            settings.PROFILER_MAX_FILES,
+        )
+        return response
+
+
+class QueryTimer:
+    """execute_wrapper: считает SQL-запросы и их суммарное время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """Собирает время ответа и SQL-запросы каждого запроса по имени view.
+
+    Значения копятся в процессе и сбрасываются в общий файл METRICS_DB
+    (core.metrics), откуда их отдаёт /metrics.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        metrics.observe('yatube_request_duration_seconds', duration,
+                        view=view)
+        metrics.inc('yatube_responses_total', view=view,
+                    status=response.status_code)
+        metrics.observe('yatube_db_queries_per_request', timer.count,
+                        view=view)
+        metrics.observe('yatube_db_duration_seconds', timer.duration,
+                        view=view)
+        metrics.flush()
+        return response
+
+
+class TemplateTimingMiddleware:
+    """Замеряет рендер каждого шаблона и тегов из TEMPLATE_TIMING_TAGS.
+
+    Включается настройкой TEMPLATE_TIMING. Итоги запроса уходят в
+    заголовок Server-Timing и в метрики (core.metrics).
+    """
+
+    def __init__(self, get_response):
+        if not settings.TEMPLATE_TIMING:
+            raise MiddlewareNotUsed
+        template_timing.install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        measured = {}
+        token = template_timing.timings.set(measured)
+        try:
+            response = self.get_response(request)
+        finally:
+            template_timing.timings.reset(token)
+        if not measured:
+            return response
+        response['Server-Timing'] = template_timing.server_timing(measured)
+        for (kind, name), (_, seconds) in measured.items():
+            metrics.observe('yatube_template_render_seconds', seconds,
+                            kind=kind, part=name)
+        return response
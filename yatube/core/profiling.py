@@ -0,0 +1,65 @@
+import os
+import pstats
+import re
+import time
+
+UNSAFE = re.compile(r'[^\w.-]+')
+
+
+def label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f'{os.path.basename(filename)}:{line}:{name}'
+
+
+def collapsed_stacks(stats):
+    """Строки «корень;...;функция микросекунды» для flamegraph.
+
+    cProfile хранит только пары вызывающий -> вызываемый, поэтому стек
+    восстанавливается приближённо: вверх по самому «тяжёлому» вызывающему.
+    """
+    raw = stats.stats
+    lines = {}
+    for func, (_, _, own_time, _, callers) in raw.items():
+        if own_time <= 0:
+            continue
+        stack, seen, current = [func], {func}, callers
+        while current:
+            parent = max(current, key=lambda caller: current[caller][3])
+            if parent in seen:
+                break
+            stack.append(parent)
+            seen.add(parent)
+            current = raw.get(parent, (0, 0, 0, 0, {}))[4]
+        key = ';'.join(label(frame) for frame in reversed(stack))
+        lines[key] = lines.get(key, 0) + own_time
+    return [f'{stack} {round(seconds * 1e6)}'
+            for stack, seconds in sorted(lines.items())]
+
+
+def save(profiler, directory, view_name, max_files):
+    """Пишет .prof и .collapsed запроса и удаляет самые старые файлы."""
+    os.makedirs(directory, exist_ok=True)
+    name = UNSAFE.sub('_', view_name or 'unresolved')
+    base = os.path.join(
+        directory, f'{name}-{time.time_ns()}-{os.getpid()}')
+    profiler.dump_stats(f'{base}.prof')
+    stats = pstats.Stats(profiler)
+    with open(f'{base}.collapsed', 'w', encoding='utf-8') as output:
+        output.write('\n'.join(collapsed_stacks(stats)) + '\n')
+    rotate(directory, max_files)
+    return base
+
+
+def rotate(directory, max_files):
+    entries = sorted(
+        (entry for entry in os.scandir(directory)
+         if entry.name.endswith(('.prof', '.collapsed'))),
+        key=lambda entry: entry.stat().st_mtime_ns,
+    )
+    for entry in entries[:max(0, len(entries) - max_files)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,61 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Состояние текущего запроса, его выставляет ReplicaRoutingMiddleware.
+# Вне запроса (команды, фоновые потоки) всё читается с основной базы.
+replica_allowed = ContextVar('replica_allowed', default=False)
+wrote = ContextVar('wrote', default=False)
+
+# Модели этих приложений можно читать с реплики: ленты и посты. Сессии и
+# пользователи всегда читаются с основной базы.
+REPLICA_APPS = {'posts'}
+
+
+@contextmanager
+def primary():
+    """Чтения внутри блока (или декорированной функции) -- с основной базы.
+
+    Так читается всё, что попадёт в общий кэш или станет валидатором
+    (ETag): отставшая реплика иначе закрепила бы устаревшие данные под
+    свежей версией.
+    """
+    token = replica_allowed.set(False)
+    try:
+        yield
+    finally:
+        replica_allowed.reset(token)
+
+
+class ReplicaRouter:
+    """Чтения лент и постов -- на реплики, записи -- на основную базу.
+
+    После первой записи в запросе и ещё REPLICA_STICKY_SECONDS после неё
+    (см. ReplicaRoutingMiddleware) пользователь читает с основной базы,
+    чтобы видеть свои изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or model._meta.app_label not in REPLICA_APPS
+            or not replica_allowed.get()
+            or wrote.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,17 @@
+from django.conf import settings
+
+
+def pragma_statements(pragmas=None):
+    if pragmas is None:
+        pragmas = settings.SQLITE_PRAGMAS
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def apply_pragmas(connection, pragmas=None):
+    """Выполняет PRAGMA из настроек на соединении sqlite3 или Django."""
+    cursor = connection.cursor()
+    try:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
+    finally:
+        cursor.close()
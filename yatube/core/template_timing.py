@@ -0,0 +1,84 @@
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.base import Node, Template, TokenType
+from django.template.loader_tags import IncludeNode
+
+# Замеры текущего запроса: метка -> [число рендеров, секунды]. None --
+# запрос не замеряется, и обёртки сразу зовут исходные методы.
+timings = ContextVar('template_timings', default=None)
+_original = {}
+# В Server-Timing попадают самые долгие метки, чтобы не раздувать ответ.
+HEADER_LIMIT = 20
+
+
+def install():
+    """Оборачивает рендер шаблонов и узлов тегов. Повторный вызов ничего
+    не делает."""
+    if _original:
+        return
+    _original.update(template=Template._render, node=Node.render_annotated)
+    Template._render = _timed_template
+    Node.render_annotated = _timed_node
+
+
+def _record(label, started):
+    current = timings.get()
+    entry = current.setdefault(label, [0, 0.0])
+    entry[0] += 1
+    entry[1] += time.perf_counter() - started
+
+
+def _timed_template(self, context):
+    if timings.get() is None:
+        return _original['template'](self, context)
+    started = time.perf_counter()
+    try:
+        return _original['template'](self, context)
+    finally:
+        _record(('template', self.name or '<string>'), started)
+
+
+def tag_label(node):
+    """Имя тега узла, для include -- с именем шаблона; None, если тег не
+    из TEMPLATE_TIMING_TAGS. Узлы живут в кэше загрузчика, поэтому метка
+    считается один раз."""
+    try:
+        return node._timing_label
+    except AttributeError:
+        pass
+    label = None
+    token = getattr(node, 'token', None)
+    if token is not None and token.token_type == TokenType.BLOCK:
+        name = token.contents.split(None, 1)[0]
+        if name in settings.TEMPLATE_TIMING_TAGS:
+            label = name
+            if isinstance(node, IncludeNode):
+                template = node.template.token.strip('\'"')
+                label = f'{name} {template}'
+    node._timing_label = label
+    return label
+
+
+def _timed_node(self, context):
+    if timings.get() is None:
+        return _original['node'](self, context)
+    label = tag_label(self)
+    if label is None:
+        return _original['node'](self, context)
+    started = time.perf_counter()
+    try:
+        return _original['node'](self, context)
+    finally:
+        _record(('tag', label), started)
+
+
+def server_timing(measured):
+    """Значение заголовка Server-Timing: самые долгие шаблоны и теги."""
+    ordered = sorted(measured.items(), key=lambda item: -item[1][1])
+    return ', '.join(
+        f'tpl{index};desc="{kind} {name} x{count}";dur={seconds * 1000:.2f}'
+        for index, ((kind, name), (count, seconds))
+        in enumerate(ordered[:HEADER_LIMIT])
+    )
@@ -0,0 +1,94 @@
+import json
+import multiprocessing
+import os
+import tempfile
+from io import StringIO
+from itertools import count
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+def bump(path, times):
+    cache = SQLiteCache(path, {})
+    for _ in range(times):
+        cache.incr('hits')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {})
+
+    def test_get_set_delete(self):
+        self.cache.set('post', {'text': 'Пост'})
+        self.assertEqual(self.cache.get('post'), {'text': 'Пост'})
+        self.assertTrue(self.cache.has_key('post'))
+        self.cache.delete('post')
+        self.assertIsNone(self.cache.get('post'))
+
+    def test_timeout(self):
+        """Просроченная запись не отдаётся и не мешает add()."""
+        self.cache.set('old', 1, timeout=0)
+        self.assertIsNone(self.cache.get('old'))
+        self.assertTrue(self.cache.add('old', 2))
+        self.assertFalse(self.cache.add('old', 3))
+        self.assertEqual(self.cache.get('old'), 2)
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняются давно не читанные записи."""
+        cache = SQLiteCache(self.path, {
+            'OPTIONS': {'MAX_ENTRIES': 3, 'CULL_FREQUENCY': 3,
+                        'CULL_INTERVAL': 1}})
+        clock = count(1000)
+        with mock.patch('core.cache.time.time', lambda: next(clock)):
+            for key in 'abc':
+                cache.set(key, key)
+            cache.get('a')
+            cache.set('d', 'd')
+            self.assertEqual(cache.get_many('abcd'),
+                             {'a': 'a', 'c': 'c', 'd': 'd'})
+
+    def test_shared_between_processes(self):
+        """Счётчик общий для процессов, incr() не теряет обновлений."""
+        self.cache.set('hits', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=bump, args=(self.path, 50))
+                   for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('hits'), 150)
+
+    def test_cull_checks_size_every_interval(self):
+        """Размер таблицы проверяется раз в CULL_INTERVAL записей."""
+        cache = SQLiteCache(self.path, {
+            'OPTIONS': {'MAX_ENTRIES': 2, 'CULL_INTERVAL': 4}})
+        for key in 'abc':
+            cache.set(key, key)
+        self.assertEqual(len(cache.get_many('abcd')), 3)
+        cache.set('d', 'd')
+        self.assertLessEqual(len(cache.get_many('abcd')), 2)
+
+
+class BenchmarkCacheTest(SimpleTestCase):
+    def test_counts_shared_increments(self):
+        """benchmark_cache: в SQLite-кэше видны incr всех процессов."""
+        out = StringIO()
+        call_command('benchmark_cache', workers=2, operations=200,
+                     backends=['sqlite'], stdout=out)
+        report = json.loads(out.getvalue())['sqlite']
+        self.assertEqual(report['incr_seen'], report['incr_calls'])
@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import tempfile
+from multiprocessing import get_context
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import metrics
+from core.middleware import MetricsMiddleware
+from posts.models import Post
+
+User = get_user_model()
+
+
+def view(request):
+    return HttpResponse('ok')
+
+
+def record(path):
+    with override_settings(METRICS_DB=path):
+        metrics.inc('yatube_responses_total', view='child', status=200)
+        metrics.flush(force=True)
+
+
+class MetricsTestMixin:
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'metrics.sqlite3')
+        settings = override_settings(METRICS_DB=self.path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        metrics.reset()
+
+
+class MetricsStoreTest(MetricsTestMixin, SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        metrics.observe('yatube_db_queries_per_request', 3, view='v')
+        metrics.observe('yatube_db_queries_per_request', 30, view='v')
+        text = metrics.render()
+        name = 'yatube_db_queries_per_request'
+        self.assertIn('# TYPE yatube_db_queries_per_request histogram', text)
+        self.assertIn(f'{name}_bucket{{le="2",view="v"}} 0', text)
+        self.assertIn(f'{name}_bucket{{le="5",view="v"}} 1', text)
+        self.assertIn(f'{name}_bucket{{le="+Inf",view="v"}} 2', text)
+        self.assertIn(f'{name}_sum{{view="v"}} 33', text)
+        self.assertIn(f'{name}_count{{view="v"}} 2', text)
+
+    def test_flush_is_throttled(self):
+        with self.settings(METRICS_FLUSH_INTERVAL=3600):
+            metrics.flush(force=True)
+            metrics.inc('yatube_responses_total', view='v', status=200)
+            metrics.flush()
+            self.assertEqual(metrics._pending[
+                'yatube_responses_total', 'status="200",view="v"'], 1)
+
+    def test_workers_share_totals(self):
+        """Процессы складывают счётчики в общий файл."""
+        processes = [get_context('fork').Process(target=record,
+                                                 args=(self.path,))
+                     for _ in range(2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        metrics.inc('yatube_responses_total', view='child', status=200)
+        self.assertIn('yatube_responses_total{status="200",view="child"} 3',
+                      metrics.render())
+
+    def test_locked_file_keeps_values(self):
+        """Занятый файл не роняет сброс: значения ждут следующей попытки."""
+        metrics.flush(force=True)
+        metrics.inc('yatube_responses_total', view='v', status=200)
+        blocker = sqlite3.connect(self.path, isolation_level=None)
+        blocker.execute('BEGIN IMMEDIATE')
+        with self.assertLogs('core.metrics', 'ERROR'):
+            metrics.flush(force=True)
+        blocker.execute('ROLLBACK')
+        blocker.close()
+        self.assertIn('yatube_responses_total{status="200",view="v"} 1',
+                      metrics.render())
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        metrics.inc('yatube_responses_total', view='v', status=200)
+        self.assertEqual(metrics.render(), '\n')
+
+
+class MetricsRequestTest(MetricsTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_middleware_labels_by_view(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            text)
+        self.assertIn(
+            'yatube_responses_total{status="200",view="posts:index"} 2',
+            text)
+        self.assertIn('yatube_db_queries_per_request_sum{view="posts:index"}',
+                      text)
+        self.assertIn(
+            'yatube_cache_requests_total{cache="page",result="miss"} 1', text)
+        self.assertIn(
+            'yatube_cache_requests_total{cache="page",result="hit"} 1', text)
+        self.assertIn(
+            'yatube_cache_requests_total{cache="fragment",result="miss"} 1',
+            text)
+
+    def test_content_type(self):
+        response = Client().get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'],
+                         'text/plain; version=0.0.4')
+
+    def test_middleware_counts_queries(self):
+        def querying(request):
+            list(User.objects.all())
+            return view(request)
+
+        request = RequestFactory().get('/')
+        MetricsMiddleware(querying)(request)
+        self.assertIn(
+            'yatube_db_queries_per_request_sum{view="unresolved"} 1',
+            metrics.render())
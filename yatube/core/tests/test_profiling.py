@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware import SamplingProfilerMiddleware
+
+
+def view(request):
+    return HttpResponse(sum(range(1000)))
+
+
+class SamplingProfilerTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.factory = RequestFactory()
+
+    def files(self):
+        return sorted(os.listdir(self.directory))
+
+    def test_disabled_by_default(self):
+        """Без доли и секрета middleware не подключается вовсе."""
+        with self.assertRaises(MiddlewareNotUsed):
+            SamplingProfilerMiddleware(view)
+
+    def test_secret_header_writes_profile(self):
+        with self.settings(PROFILER_SECRET='s3cret',
+                           PROFILER_DIR=self.directory):
+            middleware = SamplingProfilerMiddleware(view)
+            middleware(self.factory.get('/', HTTP_X_PROFILE='wrong'))
+            self.assertEqual(self.files(), [])
+            request = self.factory.get('/', HTTP_X_PROFILE='s3cret')
+            middleware(request)
+        collapsed, prof = self.files()
+        self.assertTrue(prof.startswith('unresolved-'))
+        self.assertTrue(prof.endswith('.prof'))
+        self.assertTrue(collapsed.endswith('.collapsed'))
+        with open(os.path.join(self.directory, collapsed)) as stacks:
+            lines = stacks.read().splitlines()
+        self.assertTrue(any('test_profiling.py' in line for line in lines))
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit()
+                            for line in lines))
+
+    def test_non_ascii_header_is_not_an_error(self):
+        with self.settings(PROFILER_SECRET='s3cret',
+                           PROFILER_DIR=self.directory):
+            middleware = SamplingProfilerMiddleware(view)
+            response = middleware(self.factory.get(
+                '/', HTTP_X_PROFILE='пароль'.encode().decode('latin-1')))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.files(), [])
+
+    @override_settings(PROFILER_SAMPLE_RATE=1.0, PROFILER_MAX_FILES=4)
+    def test_sampled_profiles_rotate(self):
+        """Хранятся только последние PROFILER_MAX_FILES файлов."""
+        with self.settings(PROFILER_DIR=self.directory):
+            middleware = SamplingProfilerMiddleware(view)
+            for _ in range(5):
+                middleware(self.factory.get('/'))
+        self.assertEqual(len(self.files()), 4)
@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core.management.commands.sync_replica import Command as SyncReplica
+from core.middleware import STICKY_COOKIE, ReplicaRoutingMiddleware
+from core.routers import ReplicaRouter, replica_allowed, wrote
+from posts import following, timeline
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, write=False):
+        """Куда ушли чтения поста и пользователя внутри запроса."""
+        routes = {}
+
+        def view(request):
+            if write:
+                self.router.db_for_write(Post)
+            routes['post'] = self.router.db_for_read(Post)
+            routes['user'] = self.router.db_for_read(User)
+            return HttpResponse()
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return routes, response
+
+    def test_safe_request_reads_posts_from_replica(self):
+        routes, response = self.route(self.factory.get('/'))
+        self.assertEqual(routes, {'post': 'replica', 'user': 'default'})
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_write_pins_client_to_primary(self):
+        """После записи запрос и следующие чтения клиента -- с основной."""
+        routes, response = self.route(self.factory.get('/'), write=True)
+        self.assertEqual(routes['post'], 'default')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        routes, _ = self.route(request)
+        self.assertEqual(routes['post'], 'default')
+
+    def test_unsafe_method_and_outside_request_use_primary(self):
+        routes, _ = self.route(self.factory.post('/'))
+        self.assertEqual(routes['post'], 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_sync_replica_copies_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'db.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            db = sqlite3.connect(source)
+            db.execute('CREATE TABLE post (text TEXT)')
+            db.execute("INSERT INTO post VALUES ('копия')")
+            db.commit()
+            db.close()
+            SyncReplica.copy(source, target)
+            db = sqlite3.connect(target)
+            self.assertEqual(
+                db.execute('SELECT text FROM post').fetchall(), [('копия',)])
+            db.close()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaLagTest(TransactionTestCase):
+    """Реплика -- снимок основной базы, сделанный до новых записей."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        Post.objects.create(author=self.author, text='Старый пост')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'replica.sqlite3')
+        connection.ensure_connection()
+        snapshot = sqlite3.connect(path)
+        connection.connection.backup(snapshot)
+        snapshot.close()
+        connections.databases['replica'] = dict(
+            connections.databases['default'], NAME=path)
+        self.addCleanup(self.drop_replica)
+        Post.objects.create(author=self.author, text='Новый пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def drop_replica(self):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+
+    def test_replica_lags(self):
+        self.assertFalse(Post.objects.using('replica').filter(
+            text='Новый пост').exists())
+
+    def test_cached_pages_and_etags_read_primary(self):
+        """Страница, попавшая в кэш, и тело под ETag -- с основной базы."""
+        for _ in range(2):
+            self.assertContains(
+                self.client.get(reverse('posts:index')), 'Новый пост')
+        response = self.client.get(reverse('posts:api_index'))
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_cached_follows_and_recent_posts_read_primary(self):
+        # Как в безопасном запросе без записей (ReplicaRoutingMiddleware).
+        for var, value in ((replica_allowed, True), (wrote, False)):
+            self.addCleanup(var.reset, var.set(value))
+        self.assertTrue(following.is_following(self.reader.pk, self.author.pk))
+        self.assertEqual(len(timeline.recent_posts(self.author.pk)), 2)
@@ -0,0 +1,27 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+
+class SQLitePragmasTest(TestCase):
+    def test_connection_uses_profile(self):
+        """PRAGMA из SQLITE_PRAGMAS выполняются на соединении Django."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+
+class BenchmarkSQLiteTest(SimpleTestCase):
+    def test_reports_both_profiles(self):
+        out = StringIO()
+        call_command('benchmark_sqlite', writers=2, readers=2, seconds=0.2,
+                     stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report), {'default', 'profile'})
+        self.assertGreater(report['profile']['writes_per_sec'], 0)
+        self.assertGreater(report['profile']['reads_per_sec'], 0)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from core.middleware import TemplateTimingMiddleware
+from posts.models import Post
+
+User = get_user_model()
+
+
+class TemplateTimingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {index}') for index in range(3))
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(METRICS_DB=os.path.join(
+            directory.name, 'metrics.sqlite3'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        metrics.reset()
+
+    def test_disabled_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            TemplateTimingMiddleware(HttpResponse)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(MIDDLEWARE=[
+        'core.middleware.TemplateTimingMiddleware',
+        'django.contrib.sessions.middleware.SessionMiddleware',
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+    ], TEMPLATE_TIMING=True)
+    def test_templates_and_includes_timed(self):
+        response = self.client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        self.assertIn('desc="template posts/index.html x1";dur=', header)
+        self.assertIn('desc="tag include includes/post_card.html x3"',
+                      header)
+        self.assertIn('desc="tag postcache x3"', header)
+        self.assertIn('desc="template includes/header.html x1"', header)
+        self.assertIn(
+            'yatube_template_render_seconds_count'
+            '{kind="tag",part="include includes/post_card.html"} 1',
+            metrics.render())
+
+    @override_settings(MIDDLEWARE=[
+        'core.middleware.TemplateTimingMiddleware',
+    ], TEMPLATE_TIMING=True)
+    def test_no_header_without_templates(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertNotIn('Server-Timing', response)
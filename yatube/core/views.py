@@ -1,4 +1,8 @@
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_safe
+
+from . import metrics as metrics_store
 
 
 def page_not_found(request, exception):
@@ -11,3 +15,9 @@ def csrf_failure(request, reason=''):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@require_safe
+def metrics(request):
+    return HttpResponse(metrics_store.render(),
+                        content_type='text/plain; version=0.0.4')
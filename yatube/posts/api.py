@@ -0,0 +1,129 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_safe
+
+from core.routers import primary
+
+from . import conditional
+from .models import Comment, Group, Post
+from .paginators import CursorPaginator, decode_cursor, forward_page
+from .timeline import timeline_posts
+from .views import COMMENT_CUT, POST_CUT
+
+User = get_user_model()
+
+# Поля отдаются прямо из values(), без создания объектов моделей:
+# имя в ответе -> поле выборки.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'thumbnail': 'thumbnail',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+# Файлы хранятся именем в хранилище; миниатюра -- уже готовым адресом.
+FILE_FIELDS = ('image',)
+URL_FIELDS = ('thumbnail',)
+
+
+def rows(queryset, fields, keys=()):
+    names = list(fields.values())
+    return queryset.values(*names, *(key for key in keys if key not in names))
+
+
+def serialize(row, fields):
+    data = {name: row[field] for name, field in fields.items()}
+    for name in FILE_FIELDS:
+        if name in data:
+            data[name] = (
+                settings.MEDIA_URL + data[name] if data[name] else None)
+    for name in URL_FIELDS:
+        if name in data:
+            data[name] = data[name] or None
+    return data
+
+
+def feed_response(request, posts, keys=('pub_date', 'id')):
+    """Страница ленты по ?cursor=; битый курсор -- начало ленты."""
+    paginator = CursorPaginator(rows(posts, POST_FIELDS, keys), POST_CUT,
+                                keys=keys)
+    cursor = decode_cursor(request.GET.get('cursor', ''))
+    page = paginator.keyset_page(cursor)
+    return JsonResponse({
+        'results': [serialize(row, POST_FIELDS) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def api_login_required(view):
+    """Как login_required, но 401 в JSON вместо редиректа на форму."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'detail': 'Требуется авторизация'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@require_safe
+@condition(etag_func=conditional.index_etag)
+@primary()
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@require_safe
+@condition(etag_func=conditional.group_etag)
+@primary()
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, group.posts.all())
+
+
+@require_safe
+@condition(etag_func=conditional.profile_etag)
+@primary()
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, author.posts.all())
+
+
+@require_safe
+@api_login_required
+@condition(etag_func=conditional.follow_etag)
+@primary()
+def follow_index(request):
+    posts, keys = timeline_posts(request.user)
+    return feed_response(request, posts, keys)
+
+
+@require_safe
+@condition(etag_func=conditional.post_etag)
+@primary()
+def post_detail(request, post_id):
+    post = get_object_or_404(rows(Post.objects.all(), POST_FIELDS),
+                             pk=post_id)
+    comments, next_cursor = forward_page(
+        rows(Comment.objects.filter(post_id=post_id), COMMENT_FIELDS),
+        COMMENT_CUT,
+        request.GET.get('cursor'),
+    )
+    data = serialize(post, POST_FIELDS)
+    data['comments'] = [serialize(row, COMMENT_FIELDS) for row in comments]
+    data['next'] = next_cursor
+    return JsonResponse(data)
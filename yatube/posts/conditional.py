@@ -0,0 +1,76 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+
+from core.routers import primary
+
+from . import live
+from .models import Comment, Post
+from .page_cache import page_version
+
+
+def make_etag(request, *parts):
+    """ETag ответа: версии данных плюс адрес (курсор, пользователь)."""
+    user = request.user.pk if request.user.is_authenticated else ''
+    raw = ':'.join(map(str, (*parts, request.get_full_path(), user)))
+    return md5(raw.encode()).hexdigest()
+
+
+# Функции для django.views.decorators.http.condition: 304 отдаётся до
+# вызова view. Версии page_cache меняются при любом сохранении или
+# удалении поста в ленте, поэтому ETag учитывает и правки, а не только
+# новые посты. Last-Modified не отдаётся: дата самой свежей записи не
+# меняется при правке, удалении или подписке, и клиент с одним
+# If-Modified-Since получал бы устаревшую страницу. Тело ответа под
+# таким ETag клиент хранит как валидное, поэтому view с condition
+# читают с основной базы (core.routers.primary), как и post_state.
+
+def index_etag(request):
+    return make_etag(request, page_version('index'))
+
+
+def group_etag(request, slug):
+    return make_etag(request, page_version(f'group:{slug}'))
+
+
+def profile_etag(request, username):
+    return make_etag(request, page_version(f'profile:{username}'))
+
+
+def follow_etag(request):
+    return make_etag(
+        request,
+        page_version('index'),
+        page_version(f'follow:{request.user.pk}'),
+    )
+
+
+def post_state(request, post_id):
+    """Версия поста, счётчики и даты одним запросом, один раз на запрос."""
+    if not hasattr(request, '_post_state'):
+        last_comment = Comment.objects.filter(
+            post=OuterRef('pk')).order_by('-created').values('created')[:1]
+        state = Post.objects.filter(pk=post_id).values_list(
+            'version', 'comments_count', 'author__stats__posts_count',
+            'pub_date', Subquery(last_comment),
+        )
+        with primary():
+            request._post_state = state.first()
+    return request._post_state
+
+
+def post_etag(request, post_id):
+    return make_etag(request, post_state(request, post_id))
+
+
+def live_etag(request):
+    """Опрос плашки новых постов: 304, пока не вышло постов и не менялись
+    подписки. Поток SSE не кэшируется."""
+    if settings.LIVE_STREAM:
+        return None
+    parts = [cache.get(live.VERSION_KEY)]
+    if request.GET.get('feed') == 'follow':
+        parts.append(page_version(f'follow:{request.user.pk}'))
+    return make_etag(request, *parts)
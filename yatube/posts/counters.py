@@ -0,0 +1,28 @@
+from django.db.models import F
+
+from .models import AuthorStats, Post
+
+
+def _bump(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def bump_author(user_id, field, delta):
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    if not _bump(stats, field, delta) and delta > 0:
+        AuthorStats.objects.get_or_create(user_id=user_id)
+        _bump(stats, field, delta)
+
+
+def posts_count(user):
+    """Число постов автора; без строки AuthorStats -- COUNT по постам."""
+    try:
+        return user.stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return Post.objects.filter(author=user).count()
+
+
+def bump_comments(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), 'comments_count', delta)
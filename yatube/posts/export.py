@@ -0,0 +1,69 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# Имя колонки -> поле выборки. Посты в JSONL читает import_posts.
+POST_FIELDS = {
+    'id': 'id',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'text': 'text',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'created': 'created',
+    'author': 'author__username',
+    'text': 'text',
+}
+KINDS = {
+    'posts': (Post, POST_FIELDS),
+    'comments': (Comment, COMMENT_FIELDS),
+}
+
+
+class Echo:
+    """Буфер для csv.writer, который сразу отдаёт записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def select(kind, author=None, group=None):
+    """Выборка постов или комментариев к постам автора или группы."""
+    model, fields = KINDS[kind]
+    queryset = model.objects.all()
+    prefix = 'post__' if model is Comment else ''
+    if author is not None:
+        queryset = queryset.filter(**{f'{prefix}author': author})
+    if group is not None:
+        queryset = queryset.filter(**{f'{prefix}group': group})
+    return queryset.order_by('pk').values_list(*fields.values())
+
+
+def stream(kind, fmt, queryset, chunk_size=CHUNK_SIZE):
+    """Строки выгрузки по одной: память не зависит от размера выборки."""
+    names = list(KINDS[kind][1])
+    rows = queryset.iterator(chunk_size=chunk_size)
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(names)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder,
+                         ensure_ascii=False) + '\n'
@@ -0,0 +1,36 @@
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+
+from core.routers import primary
+
+from .models import Follow
+
+FOLLOWING_KEY = 'following:{}'
+FOLLOWING_TIMEOUT = 60 * 60 * 24
+
+
+def followed_ids(user_id):
+    """id авторов, на которых подписан пользователь: отсортированный array.
+
+    Хранится в кэше компактно и сбрасывается сигналами Follow.
+    """
+    key = FOLLOWING_KEY.format(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        with primary():
+            ids = array('q', sorted(Follow.objects.filter(
+                user_id=user_id).values_list('author_id', flat=True)))
+        cache.set(key, ids, FOLLOWING_TIMEOUT)
+    return ids
+
+
+def is_following(user_id, author_id):
+    ids = followed_ids(user_id)
+    index = bisect_left(ids, author_id)
+    return index < len(ids) and ids[index] == author_id
+
+
+def forget(user_id):
+    cache.delete(FOLLOWING_KEY.format(user_id))
@@ -0,0 +1,50 @@
+from collections import Counter
+from hashlib import md5
+
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from core import metrics
+
+CARD_KEY = 'post_card:{}:{}'
+CARD_TIMEOUT = 60 * 60
+# Попадания и промахи процесса; в общий кэш не пишутся, чтобы каждая
+# карточка не стоила записи.
+_stats = Counter()
+
+
+def card_key(post):
+    """Ключ карточки: версия поста и всё, что карточка показывает из автора
+    и группы. Переименование группы или автора и удаление группы (SET_NULL
+    без сигнала поста) дают новый ключ."""
+    group = post.group
+    parts = (
+        post.version, post.author.username, post.author.get_full_name(),
+        group.slug if group else '',
+    )
+    digest = md5(repr(parts).encode()).hexdigest()
+    return CARD_KEY.format(post.pk, digest)
+
+
+def _count(name, result):
+    metrics.inc('yatube_cache_requests_total', cache='fragment',
+                result=result)
+    _stats[name] += 1
+
+
+def get_or_render(post, render):
+    """Карточка поста из кэша; рендерит и кэширует её при промахе."""
+    key = card_key(post)
+    html = cache.get(key)
+    if html is None:
+        _count('misses', 'miss')
+        html = render()
+        cache.set(key, html, CARD_TIMEOUT)
+    else:
+        _count('hits', 'hit')
+    return mark_safe(html)
+
+
+def stats():
+    """Попадания и промахи кэша карточек в этом процессе."""
+    return {name: _stats[name] for name in ('hits', 'misses')}
@@ -0,0 +1,98 @@
+import io
+import json
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+# Варианты режутся в пропорциях карточки, чтобы srcset подменял миниатюру.
+CROP = (960, 339)
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 80, 'method': 4},
+}
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+# is_animated бывает и у многокадровых MPO, но анимация только здесь.
+ANIMATED_FORMATS = ('GIF', 'WEBP', 'PNG')
+
+
+def encode(image, fmt, icc_profile=None):
+    buffer = io.BytesIO()
+    options = dict(SAVE_OPTIONS.get(fmt, {}))
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def normalize(upload):
+    """Картинка для сохранения: повёрнута по EXIF, без метаданных, не больше
+    IMAGE_MAX_SIDE по длинной стороне. Небольшие файлы без EXIF и анимация
+    сохраняются как есть. У MPO (JPEG с несколькими кадрами) берётся
+    первый кадр: Pillow пишет его только как JPEG.
+    """
+    image = Image.open(upload)
+    limit = settings.IMAGE_MAX_SIDE
+    animated = (getattr(image, 'is_animated', False)
+                and image.format in ANIMATED_FORMATS)
+    small = not image.getexif() and max(image.size) <= limit
+    if animated or small and image.format != 'MPO':
+        upload.seek(0)
+        return upload
+    fmt = 'JPEG' if image.format == 'MPO' else image.format
+    icc_profile = image.info.get('icc_profile')
+    image = ImageOps.exif_transpose(image)
+    image.info = {}
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    return ContentFile(encode(image, fmt, icc_profile), name=upload.name)
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+
+
+def variant_name(name, width, fmt):
+    stem, _ = os.path.splitext(name)
+    return f'{stem}_{width}w.{EXTENSIONS[fmt]}'
+
+
+def save_variant(storage, name, data):
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.url(storage.save(name, ContentFile(data)))
+
+
+def build_variants(image_field):
+    """Строит рядом с оригиналом варианты шириной IMAGE_VARIANT_WIDTHS
+    (и WebP, если Pillow его умеет); возвращает их описание для srcset.
+    """
+    with image_field.open('rb'):
+        source = Image.open(image_field)
+        source.load()
+    source = ImageOps.exif_transpose(source)
+    fmt = 'PNG' if has_alpha(source) else 'JPEG'
+    source = source.convert('RGBA' if fmt == 'PNG' else 'RGB')
+    webp = features.check('webp')
+    storage, name = image_field.storage, image_field.name
+    variants = []
+    for width in sorted(settings.IMAGE_VARIANT_WIDTHS):
+        if width > source.width and variants:
+            break
+        size = (width, round(width * CROP[1] / CROP[0]))
+        image = ImageOps.fit(source, size, Image.LANCZOS)
+        variant = {'width': width, 'src': save_variant(
+            storage, variant_name(name, width, fmt), encode(image, fmt))}
+        if webp:
+            variant['webp'] = save_variant(
+                storage, variant_name(name, width, 'WEBP'),
+                encode(image, 'WEBP'))
+        variants.append(variant)
+    return variants
+
+
+def dumps(variants):
+    return json.dumps(variants, separators=(',', ':'))
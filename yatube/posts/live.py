@@ -0,0 +1,67 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from .following import followed_ids
+from .models import Post
+
+VERSION_KEY = 'live:version'
+# Больше стольких новых постов не считаем: «100+» достаточно для плашки.
+MAX_COUNT = 100
+
+
+def latest_id():
+    return Post.objects.aggregate(latest=Max('pk'))['latest'] or 0
+
+
+def publish():
+    """Сообщает подписчикам потока, что появились новые посты."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        if not cache.add(VERSION_KEY, 1, None):
+            cache.incr(VERSION_KEY)
+
+
+def count_new(since, author_ids=None):
+    posts = Post.objects.filter(pk__gt=since)
+    if author_ids is not None:
+        if not author_ids:
+            return 0
+        posts = posts.filter(author_id__in=author_ids)
+    return len(posts.order_by().values_list('pk', flat=True)[:MAX_COUNT])
+
+
+def snapshot(since, user_id=None):
+    """Сколько постов новее since: во всей ленте или у авторов подписок."""
+    authors = None if user_id is None else followed_ids(user_id)
+    count = count_new(since, authors)
+    return {'count': count, 'more': count >= MAX_COUNT}
+
+
+def events(since, user_id=None):
+    """Поток SSE с числом постов новее since.
+
+    Каждые LIVE_POLL_INTERVAL секунд соединение читает один ключ кэша и
+    идёт в базу только когда тот изменился. Поток закрывается через
+    LIVE_STREAM_TIMEOUT секунд, EventSource сам переподключается.
+    """
+    deadline = time.monotonic() + settings.LIVE_STREAM_TIMEOUT
+    yield f'retry: {settings.LIVE_POLL_INTERVAL * 1000}\n\n'
+    seen, sent = object(), 0
+    while True:
+        version = cache.get(VERSION_KEY)
+        if version != seen:
+            seen = version
+            state = snapshot(since, user_id)
+            if state['count'] != sent:
+                sent = state['count']
+                yield f'event: new-posts\ndata: {json.dumps(state)}\n\n'
+        else:
+            yield ': ping\n\n'
+        if time.monotonic() >= deadline:
+            return
+        time.sleep(settings.LIVE_POLL_INTERVAL)
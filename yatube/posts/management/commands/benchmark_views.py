@@ -0,0 +1,86 @@
+import json
+import math
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.urls import app_name, urlpatterns
+
+User = get_user_model()
+
+# Эти адреса меняют данные даже на GET или держат соединение открытым,
+# их не замеряем.
+SKIPPED = {'add_comment', 'profile_follow', 'profile_unfollow', 'live_posts'}
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку и число SQL-запросов именованных адресов '
+            'posts и печатает отчёт в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на каждый адрес.')
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом.')
+        parser.add_argument('--output', help='Файл для отчёта.')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        samples = {
+            'slug': list(Group.objects.values_list('slug', flat=True)[:100]),
+            'username': list(User.objects.filter(
+                posts__isnull=False).values_list(
+                    'username', flat=True).distinct()[:100]),
+            'post_id': list(Post.objects.values_list('pk', flat=True)[:100]),
+        }
+        if not all(samples.values()):
+            raise CommandError('Нет данных для замеров, запустите seed_data.')
+        client = Client()
+        client.force_login(User.objects.filter(
+            follower__isnull=False).first() or User.objects.first())
+
+        report = {}
+        for pattern in urlpatterns:
+            if pattern.name in SKIPPED:
+                continue
+            params = pattern.pattern.converters
+            timings, queries = [], []
+            for _ in range(options['requests']):
+                url = reverse(f'{app_name}:{pattern.name}', kwargs={
+                    name: random.choice(samples[name]) for name in params})
+                if options['cold']:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    client.get(url)
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries.append(len(captured))
+            report[pattern.name] = {
+                'requests': len(timings),
+                'p50_ms': round(percentile(timings, 50), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'p99_ms': round(percentile(timings, 99), 3),
+                'queries_mean': round(sum(queries) / len(queries), 2),
+                'queries_max': max(queries),
+            }
+
+        result = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(result)
+        self.stdout.write(result)
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+from posts.models import Group
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты или комментарии в CSV/JSONL потоком.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(export.KINDS))
+        parser.add_argument('--format', choices=export.FORMATS,
+                            default='jsonl')
+        parser.add_argument('--author', help='username автора.')
+        parser.add_argument('--group', help='slug группы.')
+        parser.add_argument('--output', help='Файл; по умолчанию stdout.')
+        parser.add_argument('--chunk-size', type=int,
+                            default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            author = options['author'] and User.objects.get(
+                username=options['author'])
+            group = options['group'] and Group.objects.get(
+                slug=options['group'])
+        except (User.DoesNotExist, Group.DoesNotExist) as error:
+            raise CommandError(error)
+        queryset = export.select(
+            options['kind'], author=author or None, group=group or None)
+        lines = export.stream(options['kind'], options['format'], queryset,
+                              chunk_size=options['chunk_size'])
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            output.writelines(lines)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnail
+
+
+class Command(BaseCommand):
+    help = 'Строит недостающие миниатюры картинок постов.'
+
+    def handle(self, *args, **options):
+        pending = Post.objects.exclude(image='').filter(
+            thumbnail='').values_list('pk', flat=True)
+        done = 0
+        for post_id in pending.iterator():
+            if generate_thumbnail(post_id):
+                done += 1
+        self.stdout.write(f'Построено миниатюр: {done}')
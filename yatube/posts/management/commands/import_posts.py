@@ -0,0 +1,128 @@
+import json
+import sys
+from contextlib import contextmanager
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import page_cache, timeline
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+@contextmanager
+def explicit_pub_date():
+    """Даёт bulk_create сохранить pub_date из файла вместо текущего."""
+    field = Post._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты из JSONL: по объекту на строку с полями text, '
+        'author (username) и необязательными group (slug) и pub_date.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSONL или - для stdin.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--transaction-size', type=int, default=10000,
+            help='Сколько постов сохранять в одной транзакции.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        chunk_size = max(options['transaction_size'], batch_size)
+        self.authors = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.touched_authors, self.touched_groups = set(), set()
+        self.skipped = 0
+        imported = 0
+        with self.read_lines(options['path']) as lines, explicit_pub_date():
+            posts = (
+                post for post in map(self.parse, enumerate(lines, 1))
+                if post is not None
+            )
+            chunk = list(islice(posts, chunk_size))
+            while chunk:
+                with transaction.atomic():
+                    Post.objects.bulk_create(chunk, batch_size=batch_size)
+                imported += len(chunk)
+                self.stdout.write(f'Импортировано постов: {imported}')
+                chunk = list(islice(posts, chunk_size))
+        self.refresh_derived()
+        self.stdout.write(
+            f'Готово: импортировано {imported}, пропущено {self.skipped}')
+
+    @contextmanager
+    def read_lines(self, path):
+        if path == '-':
+            yield sys.stdin
+            return
+        try:
+            with open(path, encoding='utf-8') as lines:
+                yield lines
+        except OSError as error:
+            raise CommandError(error)
+
+    def parse(self, numbered_line):
+        number, line = numbered_line
+        if not line.strip():
+            return None
+        try:
+            data = json.loads(line)
+            text = data['text']
+            if not isinstance(text, str) or not text.strip():
+                raise ValueError(f'text: {text!r}')
+            author_id = self.authors[data['author']]
+            group = data.get('group')
+            group_id = self.groups[group] if group else None
+            pub_date = data.get('pub_date')
+            pub_date = (
+                parse_datetime(pub_date) if pub_date else timezone.now())
+            if pub_date is None:
+                raise ValueError(f'pub_date: {data["pub_date"]}')
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date)
+            post = Post(text=text, author_id=author_id,
+                        group_id=group_id, pub_date=pub_date)
+        except (ValueError, TypeError, KeyError, AttributeError) as error:
+            self.skipped += 1
+            self.stderr.write(f'Строка {number} пропущена: {error!r}')
+            return None
+        self.touched_authors.add(author_id)
+        if group_id:
+            self.touched_groups.add(group_id)
+        return post
+
+    def refresh_derived(self):
+        """bulk_create не шлёт сигналы: досчитываем ленты, счётчики, кэш."""
+        if not self.touched_authors:
+            return
+        follows = Follow.objects.filter(
+            author_id__in=self.touched_authors).values_list(
+                'user_id', 'author_id')
+        for user_id, author_id in follows.iterator():
+            timeline.backfill_follow(user_id, author_id)
+        for author_id in self.touched_authors:
+            timeline.forget_recent(author_id)
+        call_command('reconcile_counters', stdout=self.stdout)
+        usernames = User.objects.filter(
+            pk__in=self.touched_authors).values_list('username', flat=True)
+        slugs = Group.objects.filter(
+            pk__in=self.touched_groups).values_list('slug', flat=True)
+        page_cache.invalidate(
+            'index',
+            *(f'profile:{username}' for username in usernames.iterator()),
+            *(f'group:{slug}' for slug in slugs),
+        )
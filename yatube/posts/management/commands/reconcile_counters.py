@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+def count_of(queryset, field):
+    counted = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписчиков.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            missing = User.objects.filter(stats__isnull=True)
+            AuthorStats.objects.bulk_create(
+                (AuthorStats(user=user) for user in missing.iterator()),
+                ignore_conflicts=True,
+            )
+            fixed = {
+                'posts_count': self.reconcile(
+                    AuthorStats.objects, 'posts_count',
+                    count_of(Post.objects, 'author')),
+                'followers_count': self.reconcile(
+                    AuthorStats.objects, 'followers_count',
+                    count_of(Follow.objects, 'author')),
+                'comments_count': self.reconcile(
+                    Post.objects, 'comments_count',
+                    count_of(Comment.objects, 'post')),
+            }
+        for field, drifted in fixed.items():
+            self.stdout.write(f'{field}: исправлено {drifted}')
+
+    @staticmethod
+    def reconcile(queryset, field, actual):
+        drifted = queryset.annotate(actual=actual).exclude(
+            **{field: F('actual')}).values_list('pk', flat=True)
+        return queryset.filter(pk__in=list(drifted)).update(**{field: actual})
@@ -0,0 +1,86 @@
+import random
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from faker import Faker
+
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Наполняет базу тестовыми пользователями, группами и постами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        fake = Faker('ru_RU')
+        if options['seed'] is not None:
+            Faker.seed(options['seed'])
+            random.seed(options['seed'])
+        prefix = f'seed{random.getrandbits(32):x}'
+        with transaction.atomic():
+            users = self.create(User, (
+                User(username=f'{prefix}_{i}',
+                     first_name=fake.first_name(),
+                     last_name=fake.last_name())
+                for i in range(options['users'])
+            ), username__startswith=f'{prefix}_')
+            groups = self.create(Group, (
+                Group(title=fake.sentence(nb_words=3)[:200],
+                      slug=f'{prefix}-{i}',
+                      description=fake.text(200))
+                for i in range(options['groups'])
+            ), slug__startswith=f'{prefix}-')
+            posts = self.create(Post, (
+                Post(text=fake.text(400),
+                     author_id=random.choice(users),
+                     group_id=random.choice(groups + [None]))
+                for _ in range(options['posts'] if users else 0)
+            ), author_id__in=users)
+            self.create(Comment, (
+                Comment(text=fake.sentence(),
+                        author_id=random.choice(users),
+                        post_id=random.choice(posts))
+                for _ in range(options['comments'] if posts else 0)
+            ))
+            pairs = {
+                tuple(random.sample(users, 2))
+                for _ in range(options['follows'] if len(users) > 1 else 0)
+            }
+            self.create(Follow, (
+                Follow(user_id=user, author_id=author)
+                for user, author in pairs
+            ))
+            for user, author in pairs:
+                timeline.backfill_follow(user, author)
+        call_command('reconcile_counters', stdout=self.stdout)
+        self.stdout.write(
+            f'Создано: пользователей {len(users)}, групп {len(groups)}, '
+            f'постов {len(posts)}, подписок {len(pairs)}'
+        )
+
+    @staticmethod
+    def create(model, objects, **created_filter):
+        """bulk_create пачками; возвращает id созданных объектов."""
+        objects = iter(objects)
+        batch = list(islice(objects, BATCH_SIZE))
+        while batch:
+            model.objects.bulk_create(batch)
+            batch = list(islice(objects, BATCH_SIZE))
+        if not created_filter:
+            return []
+        return list(model.objects.filter(**created_filter).values_list(
+            'pk', flat=True))
@@ -0,0 +1,73 @@
+from functools import wraps
+from urllib.parse import quote
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.cache import cache_page
+
+from core import metrics
+from core.routers import primary
+
+from .models import Group
+
+VERSION_KEY = 'page_version:{}'
+
+
+def page_version(scope):
+    key = VERSION_KEY.format(quote(scope))
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(*scopes):
+    """Сбрасывает закэшированные страницы, меняя версию их префикса."""
+    cache.set_many(
+        {VERSION_KEY.format(quote(scope)): uuid4().hex for scope in scopes},
+        None)
+
+
+def cache_feed(scope):
+    """Как cache_page, но страницу можно сбросить через invalidate(scope).
+
+    scope форматируется аргументами view, например 'group:{slug}'.
+    Страница зависит от пользователя (шапка, подписка, ссылки владельца),
+    поэтому анонимы делят одну копию, а вошедшие получают свою.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            name = scope.format(**kwargs)
+            user = request.user
+            audience = f'user{user.pk}' if user.is_authenticated else 'anon'
+            prefix = f'{quote(name)}:{page_version(name)}:{audience}'
+            rendered = []
+
+            def counted(*args, **kwargs):
+                rendered.append(True)
+                with primary():
+                    return view(*args, **kwargs)
+
+            cached_view = cache_page(
+                settings.FEED_PAGE_TIMEOUT, key_prefix=prefix)(counted)
+            response = cached_view(request, *args, **kwargs)
+            metrics.inc('yatube_cache_requests_total', cache='page',
+                        result='miss' if rendered else 'hit')
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate_post(post, group_ids=()):
+    """Сбрасывает главную, профиль автора и страницы групп поста."""
+    group_ids = {post.group_id, *group_ids} - {None}
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True)
+    invalidate(
+        'index',
+        f'profile:{post.author.username}',
+        *(f'group:{slug}' for slug in slugs),
+    )
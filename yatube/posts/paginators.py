@@ -0,0 +1,178 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+SHALLOW_PAGES = 5
+FORWARD = 'n'
+BACKWARD = 'p'
+# Id из курсора уходит в SQLite, который не принимает целые вне int64.
+ID_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def pack(values):
+    raw = json.dumps(values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def unpack(token):
+    """Распаковывает токен pack(); для битого токена -- ValueError."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError) as error:
+        raise ValueError(token) from error
+
+
+def cursor_id(value):
+    """Id из курсора; ValueError, если он не влезает в int64."""
+    pk = int(value)
+    if pk not in ID_RANGE:
+        raise ValueError(value)
+    return pk
+
+
+def cursor_date(value):
+    """Дата из курсора; ValueError для даты без часового пояса."""
+    date = datetime.fromisoformat(value)
+    if date.tzinfo is None:
+        raise ValueError(value)
+    return date
+
+
+def encode_cursor(direction, pub_date, pk):
+    return pack([direction, pub_date.isoformat(), pk])
+
+
+def field(obj, name):
+    """Значение поля строки: модели или словаря из values()."""
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+def decode_cursor(token):
+    """Возвращает (direction, pub_date, pk) или None для битого курсора."""
+    try:
+        direction, pub_date, pk = unpack(token)
+        if direction not in (FORWARD, BACKWARD):
+            return None
+        return direction, cursor_date(pub_date), cursor_id(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, id) без COUNT(*) по всей выборке.
+
+    Первые SHALLOW_PAGES страниц доступны по номеру (?page=N), счётчик
+    при этом ограничен этим окном. Дальше навигация идёт по курсорам
+    (?cursor=...), которые не зависят от глубины страницы.
+
+    keys -- пара (дата, id), по которой идёт сортировка по убыванию;
+    это могут быть и аннотации выборки.
+    """
+
+    def __init__(self, object_list, per_page, shallow_pages=SHALLOW_PAGES,
+                 keys=('pub_date', 'id')):
+        self.keys = keys
+        ordering = [f'-{key}' for key in keys]
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.shallow_pages = shallow_pages
+
+    @cached_property
+    def _window_count(self):
+        limit = self.per_page * self.shallow_pages
+        window = self.object_list.order_by().values_list('pk', flat=True)
+        return len(window[:limit + 1])
+
+    @cached_property
+    def count(self):
+        return min(self._window_count, self.per_page * self.shallow_pages)
+
+    @cached_property
+    def truncated(self):
+        """Есть ли записи за пределами нумерованных страниц."""
+        return self._window_count > self.count
+
+    def page(self, number):
+        page = super().page(number)
+        page.object_list = list(page.object_list)
+        page.is_cursor = False
+        page.previous_cursor = None
+        page.next_cursor = None
+        if (
+            not page.has_next() and self.truncated and page.object_list
+        ):
+            page.next_cursor = self._cursor(FORWARD, page.object_list[-1])
+        return page
+
+    def cursor_page(self, token):
+        cursor = decode_cursor(token or '')
+        if cursor is None:
+            return self.get_page(1)
+        return self.keyset_page(cursor)
+
+    def keyset_page(self, cursor=None):
+        """Страница по курсору из decode_cursor(); без курсора -- с начала."""
+        direction, pub_date, pk = cursor or (FORWARD, None, None)
+        lookup = 'lt' if direction == FORWARD else 'gt'
+        date_key, id_key = self.keys
+        rows = self.object_list
+        if cursor is not None:
+            rows = rows.filter(
+                Q(**{f'{date_key}__{lookup}': pub_date})
+                | Q(**{date_key: pub_date, f'{id_key}__{lookup}': pk})
+            )
+        if direction == BACKWARD:
+            rows = rows.reverse()
+        rows = list(rows[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == BACKWARD:
+            rows.reverse()
+        has_next = has_more if direction == FORWARD else True
+        has_previous = (
+            has_more if direction == BACKWARD else cursor is not None)
+        page = Page(rows, None, self)
+        page.is_cursor = True
+        page.previous_cursor = (
+            self._cursor(BACKWARD, rows[0]) if has_previous and rows else None
+        )
+        page.next_cursor = (
+            self._cursor(FORWARD, rows[-1]) if has_next and rows else None
+        )
+        return page
+
+    def _cursor(self, direction, obj):
+        date_key, id_key = self.keys
+        return encode_cursor(
+            direction, field(obj, date_key), field(obj, id_key))
+
+
+def forward_page(queryset, per_page, cursor=None, keys=('created', 'id')):
+    """Страница по возрастанию keys после курсора и курсор следующей.
+
+    Для лент, которые только дочитывают вперёд (комментарии).
+    """
+    date_key, id_key = keys
+    queryset = queryset.order_by(date_key, id_key)
+    try:
+        date, pk = unpack(cursor)
+        date, pk = cursor_date(date), cursor_id(pk)
+    except (ValueError, TypeError):
+        pass
+    else:
+        queryset = queryset.filter(
+            Q(**{f'{date_key}__gt': date})
+            | Q(**{date_key: date, f'{id_key}__gt': pk})
+        )
+    rows = list(queryset[:per_page + 1])
+    if len(rows) <= per_page:
+        return rows, None
+    last = rows[per_page - 1]
+    next_cursor = pack([field(last, date_key).isoformat(),
+                        field(last, id_key)])
+    return rows[:per_page], next_cursor
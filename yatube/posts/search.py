@@ -0,0 +1,104 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .paginators import cursor_id, pack, unpack
+
+FTS_TABLE = 'posts_post_fts'
+
+# Внешний индекс FTS5 поверх posts_post; триггеры держат его в актуальном
+# состоянии при любых INSERT/UPDATE/DELETE, в том числе из queryset.update().
+# Таблица и триггеры создаются идемпотентно после каждого migrate: SQLite
+# пересоздаёт posts_post при изменении схемы, и триггеры при этом теряются.
+INSTALL_SQL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_post_fts_ai
+        AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_post_fts_ad
+        AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_post_fts_au
+        AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+    END""",
+)
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+MATCH_SQL = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+RANKED_SQL = f"""
+    SELECT id, score FROM (
+        SELECT rowid AS id, bm25({FTS_TABLE}) AS score FROM {FTS_TABLE}
+        WHERE {FTS_TABLE} MATCH %s
+    )
+    WHERE score > %s OR (score = %s AND id > %s)
+    ORDER BY score, id
+    LIMIT %s
+"""
+WORD = re.compile(r'\w+')
+
+
+def is_supported(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install(using=connection):
+    if not is_supported(using):
+        return
+    created = FTS_TABLE not in using.introspection.table_names()
+    with using.cursor() as cursor:
+        for sql in INSTALL_SQL:
+            cursor.execute(sql)
+        if created:
+            cursor.execute(REBUILD_SQL)
+
+
+def to_match(query):
+    """Запрос пользователя в выражение MATCH: все слова, по префиксу."""
+    return ' '.join(f'"{word}"*' for word in WORD.findall(query))
+
+
+def matching(queryset, query):
+    """Фильтр queryset по полнотекстовому запросу (для админки)."""
+    match = to_match(query)
+    if not match:
+        return queryset.none()
+    if not is_supported():
+        return queryset.filter(text__icontains=query)
+    return queryset.filter(pk__in=RawSQL(MATCH_SQL, [match]))
+
+
+def search(query, limit, cursor=None):
+    """Посты по убыванию релевантности и курсор следующей страницы."""
+    match = to_match(query)
+    if not match:
+        return [], None
+    if not is_supported():
+        posts = list(Post.objects.for_feed().filter(
+            text__icontains=query)[:limit])
+        return posts, None
+    try:
+        score, last_id = unpack(cursor) if cursor else (float('-inf'), 0)
+        score, last_id = float(score), cursor_id(last_id)
+    except (ValueError, TypeError):
+        score, last_id = float('-inf'), 0
+    with connection.cursor() as db:
+        db.execute(RANKED_SQL, [match, score, score, last_id, limit + 1])
+        rows = db.fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        last_id, score = rows[limit - 1]
+        next_cursor = pack([score, last_id])
+    rows = rows[:limit]
+    posts = Post.objects.for_feed().in_bulk([pk for pk, _ in rows])
+    return [posts[pk] for pk, _ in rows if pk in posts], next_cursor
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models.signals import (
+    post_delete, post_migrate, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import counters, following, live, page_cache, search, timeline
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@receiver(post_migrate)
+def install_search(sender, using, **kwargs):
+    if sender.name == 'posts':
+        search.install(connections[using])
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    if instance.pk:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk).values_list('group_id', flat=True).first()
+        instance.version += 1
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_author(instance.author_id, 'posts_count', 1)
+        timeline.fan_out_post(instance)
+        transaction.on_commit(live.publish)
+    page_cache.invalidate_post(instance, [instance._previous_group_id])
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, 'posts_count', -1)
+    timeline.forget_recent(instance.author_id)
+    page_cache.invalidate_post(instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    page_cache.invalidate(f'group:{instance.slug}')
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # Посты группы остаются без неё (SET_NULL) без сигналов поста.
+    authors = User.objects.filter(posts__group=instance).distinct()
+    page_cache.invalidate(
+        'index',
+        f'group:{instance.slug}',
+        *(f'profile:{username}'
+          for username in authors.values_list('username', flat=True)),
+    )
+
+
+def invalidate_commented(post_id):
+    # Счётчик комментариев виден в лентах и API, поэтому их страницы и
+    # ETag сбрасываются вместе с постом.
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post is not None:
+        page_cache.invalidate_post(post)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+        invalidate_commented(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    invalidate_commented(instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_author(instance.author_id, 'followers_count', 1)
+        following.forget(instance.user_id)
+        timeline.backfill_follow(instance.user_id, instance.author_id)
+        page_cache.invalidate(
+            f'profile:{instance.author.username}',
+            f'follow:{instance.user_id}',
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, 'followers_count', -1)
+    following.forget(instance.user_id)
+    timeline.drop_follow(instance.user_id, instance.author_id)
+    timeline.author_unfollowed(instance.author_id)
+    page_cache.invalidate(
+        f'profile:{instance.author.username}',
+        f'follow:{instance.user_id}',
+    )
@@ -0,0 +1,28 @@
+from django import template
+
+from posts import fragments
+
+register = template.Library()
+
+
+class PostCacheNode(template.Node):
+    def __init__(self, nodelist, post):
+        self.nodelist = nodelist
+        self.post = post
+
+    def render(self, context):
+        post = self.post.resolve(context)
+        return fragments.get_or_render(
+            post, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def postcache(parser, token):
+    """{% postcache post %}...{% endpostcache %} -- кэш карточки поста."""
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' принимает ровно один аргумент: пост")
+    nodelist = parser.parse(('endpostcache',))
+    parser.delete_first_token()
+    return PostCacheNode(nodelist, parser.compile_filter(bits[1]))
@@ -0,0 +1,110 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import (
+    AuthorStats, Comment, Follow, Group, Post, TimelineEntry)
+
+User = get_user_model()
+
+
+class SeedAndBenchmarkTest(TestCase):
+    def test_seed_data_creates_consistent_dataset(self):
+        """seed_data создаёт данные вместе со счётчиками и лентами."""
+        call_command('seed_data', users=5, groups=2, posts=30, comments=10,
+                     follows=4, seed=1, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 10)
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('posts_count', flat=True)),
+            30)
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(
+                author__following__user=follow.user).count())
+
+    def test_benchmark_views_reports_percentiles(self):
+        """benchmark_views печатает задержки и запросы по адресам."""
+        call_command('seed_data', users=3, groups=1, posts=5, comments=2,
+                     follows=2, seed=2, stdout=StringIO())
+        out = StringIO()
+        call_command('benchmark_views', requests=3, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertIn('index', report)
+        self.assertNotIn('profile_follow', report)
+        self.assertEqual(
+            set(report['post_detail']),
+            {'requests', 'p50_ms', 'p95_ms', 'p99_ms',
+             'queries_mean', 'queries_max'})
+
+
+class ImportPostsTest(TestCase):
+    def test_import_posts_from_jsonl(self):
+        """import_posts сохраняет посты пачками и пропускает битые строки."""
+        author = User.objects.create_user(username='importer')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        Group.objects.create(title='Архив', slug='archive')
+        lines = [
+            {'text': f'Пост {i}', 'author': 'importer', 'group': 'archive',
+             'pub_date': f'2020-01-0{i + 1}T12:00:00+00:00'}
+            for i in range(5)
+        ]
+        lines.append({'text': 'Чужой', 'author': 'nobody'})
+        lines.append({'text': None, 'author': 'importer'})
+        lines.append({'text': '  ', 'author': 'importer'})
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as source:
+            source.write('\n'.join(map(json.dumps, lines)) + '\nnot json\n')
+            source.flush()
+            out, err = StringIO(), StringIO()
+            call_command('import_posts', source.name, batch_size=2,
+                         transaction_size=3, stdout=out, stderr=err)
+        self.assertEqual(Post.objects.filter(group__slug='archive').count(), 5)
+        self.assertEqual(
+            Post.objects.earliest('pub_date').pub_date.isoformat(),
+            '2020-01-01T12:00:00+00:00')
+        self.assertIn('Импортировано постов: 3', out.getvalue())
+        self.assertIn('пропущено 4', out.getvalue())
+        self.assertEqual(err.getvalue().count('пропущена'), 4)
+        self.assertEqual(AuthorStats.objects.get(user=author).posts_count, 5)
+        self.assertEqual(TimelineEntry.objects.filter(user=reader).count(), 5)
+
+
+class ExportPostsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='exporter')
+        cls.group = Group.objects.create(title='Группа', slug='export')
+        Post.objects.bulk_create(
+            [Post(text=f'Пост, номер {i}', author=cls.author, group=cls.group)
+             for i in range(5)]
+        )
+
+    def test_export_round_trips_through_import(self):
+        """Выгрузка постов в JSONL читается import_posts."""
+        with tempfile.NamedTemporaryFile('r', suffix='.jsonl') as output:
+            call_command('export_posts', 'posts', author='exporter',
+                         output=output.name, chunk_size=2)
+            texts = sorted(json.loads(line)['text'] for line in output)
+            Post.objects.all().delete()
+            call_command('import_posts', output.name, stdout=StringIO())
+        self.assertEqual(texts, [f'Пост, номер {i}' for i in range(5)])
+        self.assertEqual(
+            sorted(Post.objects.filter(group=self.group).values_list(
+                'text', flat=True)), texts)
+
+    def test_export_comments_csv(self):
+        """Комментарии выгружаются в CSV с заголовком."""
+        Comment.objects.create(
+            post=Post.objects.first(), author=self.author, text='Ура')
+        out = StringIO()
+        call_command('export_posts', 'comments', format='csv',
+                     group='export', stdout=out)
+        header, row = out.getvalue().splitlines()
+        self.assertEqual(header, 'id,post,created,author,text')
+        self.assertTrue(row.endswith(',exporter,Ура'))
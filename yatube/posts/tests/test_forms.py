@@ -1,5 +1,7 @@
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
@@ -7,11 +9,15 @@ from django.urls import reverse
 from django.contrib.auth import get_user_model
 from http import HTTPStatus
 from django.conf import settings
+from PIL import Image, features
 
+from posts import images
 from posts.models import Group, Post
+from posts.thumbnails import generate_thumbnail
 
 
 User = get_user_model()
+ORIENTATION = 0x0112
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -96,3 +102,98 @@ class TaskCreateFormTests(TestCase):
             Post.objects.filter(text=form_data['text']).exists(),
         )
         self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_edit_keeps_concurrent_counters(self):
+        """Правка не перезаписывает счётчик комментариев и версию."""
+        version = Post.objects.get(pk=self.post.pk).version
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(self.post.id,)),
+            data={'text': 'Правка', 'group': self.group.pk},
+        )
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text, 'Правка')
+        self.assertEqual(post.comments_count, 5)
+        self.assertEqual(post.version, version + 1)
+
+    def test_thumbnail_is_generated_for_upload(self):
+        """Миниатюра строится заранее, до неё показывается заглушка."""
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=(
+                b'\x47\x49\x46\x38\x39\x61\x01\x00'
+                b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+                b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+                b'\x00\x00\x01\x00\x01\x00\x00\x02'
+                b'\x02\x4c\x01\x00\x3b'
+            ),
+            content_type='image/gif'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertEqual(post.thumbnail, '')
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        self.assertContains(response, 'img/placeholder.svg')
+
+        url = generate_thumbnail(post.id)
+        post.refresh_from_db()
+        self.assertEqual(post.thumbnail, url)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        self.assertContains(response, url)
+        self.assertContains(response, f'srcset="{post.srcset}"')
+
+    @override_settings(IMAGE_MAX_SIDE=300, IMAGE_VARIANT_WIDTHS=(100, 200))
+    def test_upload_is_normalized(self):
+        """Большая картинка уменьшается, поворачивается по EXIF без EXIF."""
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        content = BytesIO()
+        Image.new('RGB', (600, 200), 'red').save(
+            content, 'JPEG', exif=exif.tobytes())
+        uploaded = SimpleUploadedFile(
+            name='photo.jpg', content=content.getvalue(),
+            content_type='image/jpeg')
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Фото', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Фото')
+        with post.image.open('rb'), Image.open(post.image) as saved:
+            self.assertEqual(saved.size, (100, 300))
+            self.assertFalse(saved.getexif())
+
+        generate_thumbnail(post.id)
+        post.refresh_from_db()
+        self.assertIn('_100w.jpg 100w', post.srcset)
+        self.assertNotIn('200w', post.srcset)
+        if features.check('webp'):
+            self.assertIn('_100w.webp 100w', post.webp_srcset)
+
+    @override_settings(IMAGE_MAX_SIDE=300)
+    def test_multiframe_upload(self):
+        """Анимированный GIF хранится как есть, у MPO остаётся первый кадр
+        в JPEG."""
+        content = BytesIO()
+        frames = [Image.new('P', (20, 20), color) for color in (1, 2)]
+        frames[0].save(content, 'GIF', save_all=True,
+                       append_images=frames[1:])
+        uploaded = SimpleUploadedFile('anim.gif', content.getvalue())
+        self.assertIs(images.normalize(uploaded), uploaded)
+
+        content = BytesIO()
+        Image.new('RGB', (20, 20), 'red').save(content, 'JPEG')
+        # Pillow 8.3 не пишет MPO: JPEG выдаётся за многокадровый MPO.
+        mpo = Image.open(BytesIO(content.getvalue()))
+        mpo.format, mpo.is_animated = 'MPO', True
+        uploaded = SimpleUploadedFile('stereo.jpg', content.getvalue())
+        with mock.patch('posts.images.Image.open', return_value=mpo):
+            normalized = images.normalize(uploaded)
+        self.assertIsNot(normalized, uploaded)
+        with Image.open(normalized) as saved:
+            self.assertEqual(saved.format, 'JPEG')
+            self.assertEqual(saved.size, (20, 20))
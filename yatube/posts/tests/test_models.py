@@ -1,8 +1,17 @@
+import re
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
 
-from posts.models import Group, Post, Comment
+from posts.models import AuthorStats, Group, Post, Comment, Follow
+from posts.paginators import FORWARD, encode_cursor
 
 User = get_user_model()
 
@@ -46,3 +55,102 @@ class PostModelTest(TestCase):
         comment = PostModelTest.comment
 
         self.assertEqual(str(comment), comment.text)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_changes(self):
+        """Счётчики обновляются при создании и удалении объектов."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(post.comments_count, 1)
+
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_reconcile_counters_fixes_drift(self):
+        """reconcile_counters пересчитывает разошедшиеся счётчики."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='-')
+        AuthorStats.objects.filter(user=self.author).update(posts_count=7)
+        AuthorStats.objects.filter(user=self.reader).delete()
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+
+        call_command('reconcile_counters', stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 1)
+        self.assertTrue(AuthorStats.objects.filter(user=self.reader).exists())
+
+
+class FeedQueryPlanTest(TestCase):
+    """Запросы лент идут по индексам, без полного скана и сортировки."""
+
+    BAD_PLAN = re.compile(
+        r'SCAN (TABLE )?posts_\w+(?! USING)(\s|$)|USE TEMP B-TREE')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='-')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+        Comment.objects.create(post=cls.post, author=cls.reader, text='-')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def assert_plans_use_indexes(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        feed_queries = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and 'posts_' in query['sql']
+        ]
+        self.assertTrue(feed_queries)
+        with connection.cursor() as cursor:
+            for sql in feed_queries:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+                with self.subTest(url=url, sql=sql):
+                    self.assertIsNone(self.BAD_PLAN.search(plan), plan)
+
+    def test_feed_queries_use_indexes(self):
+        last = Post.objects.get(pk=self.post.pk)
+        cursor = encode_cursor(FORWARD, last.pub_date, last.pk)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + f'?cursor={cursor}',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug})
+            + f'?cursor={cursor}',
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:profile', kwargs={'username': 'author'})
+            + f'?cursor={cursor}',
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            self.assert_plans_use_indexes(url)
@@ -1,14 +1,23 @@
+import json
 import tempfile
 
-from django.test import TestCase, Client, override_settings
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
 from django.urls import reverse
 from django.conf import settings
 from django import forms
+from django.utils.http import http_date
 
-from posts.models import Group, Post, Follow
+from posts.models import (AuthorStats, Comment, Group, Post, Follow,
+                          TimelineEntry)
+from posts import following, fragments, live, search
+from posts.paginators import (CursorPaginator, FORWARD, decode_cursor,
+                              encode_cursor, forward_page, pack)
+from posts.views import paginate_posts
 
 
 User = get_user_model()
@@ -111,6 +120,17 @@ class PostsPagesTest(TestCase):
         self.assertEqual(context.group, self.group)
         self.assertEqual(context.image, self.post.image)
 
+    def test_profile_without_author_stats(self):
+        """Профиль открывается и без строки AuthorStats."""
+        AuthorStats.objects.filter(user=self.user).delete()
+        response = self.authorized_client.get(reverse(
+            'posts:profile', kwargs={'username': self.user.username}))
+        self.assertEqual(response.context['count'], 1)
+        response = self.authorized_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertEqual(response.context['posts_count'], 1)
+        self.assertContains(response, '<span >1</span>')
+
     def test_post_detail_page_show_correct_context(self):
         """Шаблон post_detail сформирован с правильным контекстом."""
         response = self.authorized_client.get(reverse(
@@ -165,16 +185,452 @@ class PostsPagesTest(TestCase):
         self.assertNotIn(self.post, response_group1.context['page_obj'])
 
     def test_cache_index(self):
+        """Главная кэшируется и сбрасывается при изменении поста."""
         first_response = self.authorized_client.get(reverse('posts:index'))
-        post_1 = Post.objects.get(id=1)
-        post_1.text = 'Измененный текст'
-        post_1.save()
+        Post.objects.filter(id=self.post.id).update(text='Без сигналов')
         second_response = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(first_response.content, second_response.content)
-        cache.clear()
+        post_1 = Post.objects.get(id=self.post.id)
+        post_1.text = 'Измененный текст'
+        post_1.save()
         third_response = self.authorized_client.get(reverse('posts:index'))
         self.assertNotEqual(first_response.content, third_response.content)
 
+    def test_cached_pages_are_per_user(self):
+        """Закэшированная страница вошедшего не отдаётся другим."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        reader_client = Client()
+        reader_client.force_login(reader)
+        profile_url = reverse('posts:profile',
+                              kwargs={'username': self.user.username})
+        export_url = reverse('posts:profile_export',
+                             kwargs={'username': self.user.username})
+        self.assertContains(reader_client.get(profile_url), 'Отписаться')
+        self.assertContains(self.authorized_client.get(profile_url),
+                            export_url)
+        response = self.guest_client.get(profile_url)
+        self.assertNotContains(response, 'Отписаться')
+        self.assertNotContains(response, export_url)
+        self.assertNotContains(response, 'reader')
+        self.guest_client.get(reverse('posts:index'))
+        self.assertContains(reader_client.get(reverse('posts:index')),
+                            'reader')
+
+    def test_feed_pages_invalidated_by_post_changes(self):
+        """Страницы группы и профиля сбрасываются при изменении поста."""
+        group_url = reverse('posts:group_list',
+                            kwargs={'slug': self.group.slug})
+        group1_url = reverse('posts:group_list',
+                             kwargs={'slug': self.group1.slug})
+        profile_url = reverse('posts:profile',
+                              kwargs={'username': self.user.username})
+        for url in (group_url, group1_url, profile_url):
+            self.guest_client.get(url)
+        post = Post.objects.get(id=self.post.id)
+        post.group = self.group1
+        post.text = 'Переехал в другую группу'
+        post.save()
+        self.assertNotContains(self.guest_client.get(group_url),
+                               'Переехал в другую группу')
+        self.assertContains(self.guest_client.get(group1_url),
+                            'Переехал в другую группу')
+        self.assertContains(self.guest_client.get(profile_url),
+                            'Переехал в другую группу')
+
+    def test_post_card_fragment_cache(self):
+        """Карточка поста кэшируется и обновляется после редактирования."""
+        group_url = reverse('posts:group_list',
+                            kwargs={'slug': self.group.slug})
+        before = fragments.stats()
+        self.guest_client.get(group_url)
+        self.assertEqual(fragments.stats(), {
+            'hits': before['hits'], 'misses': before['misses'] + 1})
+        self.guest_client.get(reverse(
+            'posts:profile', kwargs={'username': self.user.username}))
+        self.assertEqual(fragments.stats(), {
+            'hits': before['hits'] + 1, 'misses': before['misses'] + 1})
+
+        Post.objects.filter(pk=self.post.pk).update(text='Без версии')
+        self.assertNotContains(self.guest_client.get(group_url), 'Без версии')
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': 'Новый текст', 'group': self.group.id},
+        )
+        self.assertContains(self.guest_client.get(group_url), 'Новый текст')
+
+    def test_post_card_forgets_deleted_group(self):
+        """После удаления группы карточка не ссылается на неё."""
+        group = Group.objects.create(title='Временная', slug='temporary',
+                                     description='Удалится')
+        author = User.objects.create_user(username='temporary_author')
+        Post.objects.create(text='Пост группы', author=author, group=group)
+        profile_url = reverse('posts:profile',
+                              kwargs={'username': author.username})
+        group_url = reverse('posts:group_list', kwargs={'slug': group.slug})
+        self.assertContains(self.guest_client.get(profile_url), group_url)
+        group.delete()
+        self.assertNotContains(self.guest_client.get(profile_url), group_url)
+
+
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Commenter')
+        cls.post = Post.objects.create(text='Популярный', author=cls.user)
+        readers = [User.objects.create_user(username=f'reader{i}')
+                   for i in range(5)]
+        Comment.objects.bulk_create(
+            [Comment(post=cls.post, author=readers[i % 5], text=f'к{i}')
+             for i in range(25)]
+        )
+
+    def test_post_detail_shows_first_batch(self):
+        """На странице поста первая порция комментариев без N+1."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        comment_queries = [
+            q for q in queries
+            if q['sql'].startswith('SELECT "posts_comment"')]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertEqual(len(response.context['comments']), 20)
+        self.assertContains(response, 'data-more=')
+
+    def test_comments_fragment_loads_next_batch(self):
+        """Фрагмент отдаёт следующую порцию комментариев."""
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}))
+        fragment = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'cursor': response.context['next_cursor']},
+        )
+        self.assertTemplateUsed(fragment, 'includes/comment_list.html')
+        self.assertTemplateNotUsed(fragment, 'base.html')
+        texts = [c.text for c in response.context['comments']]
+        texts += [c.text for c in fragment.context['comments']]
+        self.assertEqual(texts, [f'к{i}' for i in range(25)])
+        self.assertIsNone(fragment.context['next_cursor'])
+        self.assertNotContains(fragment, 'data-more=')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Searcher')
+        cls.cat_posts = Post.objects.bulk_create(
+            [Post(text=f'Кошка номер {i}', author=cls.user)
+             for i in range(12)]
+        )
+        cls.dog_post = Post.objects.create(
+            text='Собака лает', author=cls.user)
+
+    def test_search_finds_matching_posts(self):
+        """Поиск находит посты по словам и префиксам."""
+        response = self.client.get(reverse('posts:search'), {'q': 'соба'})
+        self.assertEqual(response.context['posts'], [self.dog_post])
+
+    def test_search_follows_updates(self):
+        """Индекс обновляется при изменении и удалении постов."""
+        Post.objects.filter(pk=self.dog_post.pk).update(text='Собака спит')
+        posts, _ = search.search('лает', 10)
+        self.assertEqual(posts, [])
+        posts, _ = search.search('спит', 10)
+        self.assertEqual([post.pk for post in posts], [self.dog_post.pk])
+        self.dog_post.delete()
+        self.assertEqual(search.search('спит', 10), ([], None))
+
+    def test_search_is_paginated_by_cursor(self):
+        """Результаты поиска листаются курсором без повторов."""
+        first = self.client.get(reverse('posts:search'), {'q': 'кошка'})
+        self.assertEqual(len(first.context['posts']), 10)
+        second = self.client.get(reverse('posts:search'), {
+            'q': 'кошка', 'cursor': first.context['next_cursor']})
+        self.assertEqual(len(second.context['posts']), 2)
+        self.assertIsNone(second.context['next_cursor'])
+        found = first.context['posts'] + second.context['posts']
+        self.assertEqual(len({post.pk for post in found}), 12)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по полнотекстовому индексу."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собака'})
+        self.assertEqual(list(response.context['cl'].queryset),
+                         [self.dog_post])
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Writer')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api-group', description='Описание')
+        Post.objects.bulk_create(
+            [Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+             for i in range(12)]
+        )
+        cls.post = Post.objects.create(text='Свежий пост', author=cls.author)
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ого')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_is_paginated_by_cursor(self):
+        """Лента API листается курсором без повторов."""
+        first = self.client.get(reverse('posts:api_index')).json()
+        self.assertEqual(len(first['results']), 10)
+        self.assertIsNone(first['previous'])
+        self.assertEqual(first['results'][0]['text'], 'Свежий пост')
+        self.assertEqual(first['results'][0]['author'], 'Writer')
+        second = self.client.get(
+            reverse('posts:api_index'), {'cursor': first['next']}).json()
+        self.assertEqual(len(second['results']), 3)
+        self.assertIsNone(second['next'])
+        ids = {row['id'] for row in first['results'] + second['results']}
+        self.assertEqual(len(ids), 13)
+
+    def test_file_urls(self):
+        """Картинка отдаётся с MEDIA_URL, миниатюра -- как сохранена."""
+        Post.objects.filter(pk=self.post.pk).update(
+            image='posts/cat.jpg', thumbnail='/media/cache/ab/cat.jpg')
+        data = self.client.get(reverse(
+            'posts:api_post_detail', args=(self.post.pk,))).json()
+        self.assertEqual(data['image'], '/media/posts/cat.jpg')
+        self.assertEqual(data['thumbnail'], '/media/cache/ab/cat.jpg')
+
+    def test_group_and_profile_feeds(self):
+        """Ленты группы и автора фильтруют посты."""
+        group = self.client.get(reverse(
+            'posts:api_group_list', args=[self.group.slug])).json()
+        self.assertTrue(all(
+            row['group'] == self.group.slug for row in group['results']))
+        profile = self.client.get(reverse(
+            'posts:api_profile', args=[self.user.username])).json()
+        self.assertEqual(profile['results'], [])
+
+    def test_conditional_get(self):
+        """Повторный запрос с ETag получает 304, пока пост и его
+        комментарии не изменены."""
+        url = reverse('posts:api_index')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        etag = response['ETag']
+        Comment.objects.create(post=post, author=self.user, text='Новый')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся с комментариями; новый комментарий меняет ETag."""
+        url = reverse('posts:api_post_detail', args=[self.post.pk])
+        response = self.client.get(url)
+        data = response.json()
+        self.assertEqual(data['text'], 'Свежий пост')
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']], ['Ого'])
+        etag = response['ETag']
+        Comment.objects.create(post=self.post, author=self.user, text='Ещё')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['comments']), 2)
+
+    def test_follow_feed(self):
+        """Лента подписок требует входа и меняется после подписки."""
+        url = reverse('posts:api_follow_index')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.json()['results'], [])
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 10)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Visitor')
+        cls.author = User.objects.create_user(username='Blogger')
+        cls.group = Group.objects.create(
+            title='Группа', slug='etag-group', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assertNotModified(self, url):
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
+        return etag
+
+    def test_group_not_modified(self):
+        """Страница группы отдаёт 304, пока в группе нет изменений."""
+        url = reverse('posts:group_list', args=[self.group.slug])
+        etag = self.assertNotModified(url)
+        Post.objects.create(text='Ещё', author=self.author, group=self.group)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_not_modified(self):
+        """Подписка на автора меняет ETag его профиля."""
+        url = reverse('posts:profile', args=[self.author.username])
+        etag = self.assertNotModified(url)
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['following'])
+
+    def test_post_detail_not_modified(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.assertNotModified(url)
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_no_last_modified(self):
+        """Правка поста не меняет даты записей, поэтому Last-Modified не
+        отдаётся и If-Modified-Since не даёт устаревших 304."""
+        urls = (
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:api_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertNotIn('Last-Modified', response)
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=http_date())
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """Разметка зависит от пользователя, поэтому и ETag тоже."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        self.client.logout()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ExportViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Owner')
+        Post.objects.create(text='Первый, с запятой', author=cls.author)
+
+    def test_owner_downloads_csv(self):
+        """Владелец профиля получает потоковую выгрузку постов."""
+        self.client.force_login(self.author)
+        response = self.client.get(
+            reverse('posts:profile_export', args=['Owner']))
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('"Первый, с запятой"', body)
+        self.assertIn('attachment', response['Content-Disposition'])
+
+    def test_export_jsonl(self):
+        """Формат выбирается параметром format."""
+        self.client.force_login(self.author)
+        response = self.client.get(
+            reverse('posts:profile_export', args=['Owner']),
+            {'format': 'jsonl'})
+        rows = [json.loads(line) for line in response.streaming_content]
+        self.assertEqual(rows[0]['text'], 'Первый, с запятой')
+
+    def test_export_is_owner_only(self):
+        """Чужую выгрузку скачать нельзя."""
+        self.client.force_login(User.objects.create_user(username='Other'))
+        response = self.client.get(
+            reverse('posts:profile_export', args=['Owner']))
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(LIVE_STREAM=True, LIVE_POLL_INTERVAL=0,
+                   LIVE_STREAM_TIMEOUT=0)
+class LivePostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Watcher')
+        cls.author = User.objects.create_user(username='Poster')
+        cls.other = User.objects.create_user(username='Stranger')
+        cls.old_post = Post.objects.create(text='Старый', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def stream(self, **params):
+        response = self.client.get(reverse('posts:live_posts'), params)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return b''.join(response.streaming_content).decode()
+
+    def test_index_reports_new_posts(self):
+        """Поток сообщает, сколько постов вышло после открытия ленты."""
+        response = self.client.get(reverse('posts:index'))
+        since = response.context['live_since']
+        self.assertEqual(since, self.old_post.pk)
+        self.assertNotIn('new-posts', self.stream(feed='index', since=since))
+        Post.objects.create(text='Новый', author=self.other)
+        body = self.stream(feed='index', since=since)
+        self.assertIn('event: new-posts\ndata: {"count": 1', body)
+
+    def test_follow_feed_counts_followed_authors_only(self):
+        """В ленте подписок считаются только посты избранных авторов."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.client.force_login(self.user)
+        since = self.old_post.pk
+        Post.objects.create(text='Чужой', author=self.other)
+        Post.objects.create(text='Свой', author=self.author)
+        body = self.stream(feed='follow', since=since)
+        self.assertIn('"count": 1,', body)
+
+    def test_follow_feed_requires_login(self):
+        response = self.client.get(
+            reverse('posts:live_posts'), {'feed': 'follow'})
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(LIVE_STREAM=False)
+    def test_short_poll_by_default(self):
+        """Без LIVE_STREAM плашка опрашивает JSON; пока постов нет -- 304."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'data-stream="1"')
+        url = reverse('posts:live_posts')
+        params = {'feed': 'index', 'since': self.old_post.pk}
+        response = self.client.get(url, params)
+        self.assertEqual(response.json(), {'count': 0, 'more': False})
+        etag = response['ETag']
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='Новый', author=self.other)
+        live.publish()  # в TestCase on_commit не срабатывает
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json(), {'count': 1, 'more': False})
+
+    @override_settings(LIVE_STREAM=False)
+    def test_since_out_of_range(self):
+        """Курсор вне int64 не роняет опрос, а считается от свежего поста."""
+        response = self.client.get(
+            reverse('posts:live_posts'), {'feed': 'index', 'since': 2 ** 70})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'count': 0, 'more': False})
+
 
 class FollowTests(TestCase):
     @classmethod
@@ -246,6 +702,85 @@ class FollowTests(TestCase):
                                              author=author_user).exists()
         self.assertFalse(follow_exist)
 
+    def test_timeline_follows_posts_and_subscriptions(self):
+        """Лента подписок наполняется при публикации и подписке."""
+        author_user = User.objects.create_user(username='author_user')
+        old_post = Post.objects.create(text='до подписки', author=author_user)
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', args=(author_user.username,)))
+        new_post = Post.objects.create(text='после', author=author_user)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.user).values_list('post_id', flat=True)),
+            {old_post.pk, new_post.pk},
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [new_post, old_post])
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow', args=(author_user.username,)))
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    @override_settings(FEED_PULL_THRESHOLD=0)
+    def test_hybrid_feed_merges_pulled_authors(self):
+        """Посты тяжёлых авторов подмешиваются в ленту при чтении."""
+        pushed_author = User.objects.create_user(username='pushed')
+        pulled_author = User.objects.create_user(username='pulled')
+        Follow.objects.create(user=self.user, author=pulled_author)
+        first = Post.objects.create(text='первый', author=pulled_author)
+        with override_settings(FEED_PULL_THRESHOLD=1000):
+            Follow.objects.create(user=self.user, author=pushed_author)
+            second = Post.objects.create(text='второй', author=pushed_author)
+        third = Post.objects.create(text='третий', author=pulled_author)
+        self.assertFalse(TimelineEntry.objects.filter(
+            author=pulled_author).exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [third, second, first])
+
+    @override_settings(FEED_PULL_THRESHOLD=1)
+    def test_feed_survives_crossing_pull_threshold(self):
+        """Посты не теряются, когда автор становится тяжёлым и обратно."""
+        author_user = User.objects.create_user(username='author_user')
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.user, author=author_user)
+        pushed = Post.objects.create(text='разложен', author=author_user)
+        Follow.objects.create(user=other, author=author_user)
+        pulled = Post.objects.create(text='подмешан', author=author_user)
+        self.assertFalse(TimelineEntry.objects.filter(post=pulled).exists())
+        for user in (self.user, other):
+            self.authorized_client.force_login(user)
+            response = self.authorized_client.get(
+                reverse('posts:follow_index'))
+            self.assertEqual(list(response.context['page_obj']),
+                             [pulled, pushed])
+        Follow.objects.filter(user=other).delete()
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.user).values_list('post_id', flat=True)),
+            {pushed.pk, pulled.pk},
+        )
+        self.authorized_client.force_login(self.user)
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [pulled, pushed])
+
+    def test_following_check_uses_cached_ids(self):
+        """Проверка подписки в профиле идёт по кэшу, без запроса к Follow."""
+        author_user = User.objects.create_user(username='author_user')
+        url = reverse('posts:profile', args=(author_user.username,))
+        self.assertFalse(following.is_following(self.user.pk, author_user.pk))
+        Follow.objects.create(user=self.user, author=author_user)
+        self.assertEqual(
+            list(following.followed_ids(self.user.pk)), [author_user.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertFalse(
+            [q for q in queries if 'posts_follow' in q['sql']])
+        Follow.objects.filter(user=self.user).delete()
+        self.assertFalse(following.is_following(self.user.pk, author_user.pk))
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -295,3 +830,112 @@ class PaginatorViewsTest(TestCase):
             'posts:profile',
             kwargs={'username': self.user.username}) + '?page=2')
         self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """Число запросов ленты не растёт с числом постов на странице."""
+        other_group = Group.objects.create(
+            title='Другая группа', slug='other-slug', description='-')
+        Post.objects.create(text='Пост', author=self.user, group=other_group)
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                with CaptureQueriesContext(connection) as full_page:
+                    self.client.get(page)
+                cache.clear()
+                with CaptureQueriesContext(connection) as last_page:
+                    self.client.get(page + '?page=2')
+                cache.clear()
+                self.assertEqual(len(full_page), len(last_page))
+
+    def test_pages_do_not_count_whole_table(self):
+        """Нумерованные страницы не считают всю таблицу."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:index'))
+        feed = [q['sql'] for q in queries if 'posts_post' in q['sql']]
+        self.assertTrue(feed)
+        for sql in feed:
+            self.assertNotIn('COUNT', sql)
+            self.assertIn('LIMIT', sql)
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.posts = Post.objects.bulk_create(
+            [Post(text=f'Пост {i}', author=cls.user) for i in range(25)]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, **params):
+        request = RequestFactory().get('/', params)
+        return paginate_posts(Post.objects.all(), 10, request)
+
+    def test_last_shallow_page_links_to_cursor(self):
+        """Последняя нумерованная страница отдаёт курсор дальше."""
+        paginator = CursorPaginator(Post.objects.all(), 10, shallow_pages=1)
+        page = paginator.page(1)
+        self.assertTrue(paginator.truncated)
+        self.assertFalse(page.has_next())
+        self.assertIsNotNone(page.next_cursor)
+
+    def test_cursor_walks_forward_and_back(self):
+        """Курсоры проходят выборку вперёд и назад без пропусков."""
+        paginator = CursorPaginator(Post.objects.all(), 10, shallow_pages=1)
+        first = paginator.page(1)
+        second = paginator.cursor_page(first.next_cursor)
+        third = paginator.cursor_page(second.next_cursor)
+        self.assertEqual(len(second), 10)
+        self.assertEqual(len(third), 5)
+        self.assertIsNone(third.next_cursor)
+        seen = [p.pk for p in first] + [p.pk for p in second]
+        seen += [p.pk for p in third]
+        self.assertEqual(len(set(seen)), 25)
+        back = paginator.cursor_page(third.previous_cursor)
+        self.assertEqual([p.pk for p in back], [p.pk for p in second])
+        top = paginator.cursor_page(back.previous_cursor)
+        self.assertEqual([p.pk for p in top], [p.pk for p in first])
+        self.assertIsNone(top.previous_cursor)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор возвращает первую страницу."""
+        page = self.get_page(cursor='не-курсор')
+        self.assertEqual(page.number, 1)
+        self.assertEqual(len(page), 10)
+
+    def test_out_of_range_cursor_returns_first_page(self):
+        """Курсор с id вне int64 или датой без пояса считается битым."""
+        last = self.posts[-1]
+        tampered = [
+            encode_cursor(FORWARD, last.pub_date, 2 ** 63),
+            pack([FORWARD, last.pub_date.replace(tzinfo=None).isoformat(),
+                  last.pk]),
+        ]
+        for cursor in tampered:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor))
+                for url in (reverse('posts:index'),
+                            reverse('posts:api_index'),
+                            reverse('posts:search') + '?q=Пост&'):
+                    separator = '' if url.endswith('&') else '?'
+                    response = self.client.get(
+                        f'{url}{separator}cursor={cursor}')
+                    self.assertEqual(response.status_code, 200)
+        rows, _ = forward_page(
+            Comment.objects.all(), 10, pack([last.pub_date.isoformat(),
+                                             2 ** 63]))
+        self.assertEqual(rows, [])
+
+    def test_cursor_page_is_rendered(self):
+        """Страница по курсору рендерится с навигацией."""
+        last = self.get_page().object_list[-1]
+        cursor = encode_cursor(FORWARD, last.pub_date, last.pk)
+        response = self.client.get(f'{reverse("posts:index")}?cursor={cursor}')
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(response, '?cursor=')
@@ -0,0 +1,74 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from sorl.thumbnail import get_thumbnail
+
+from core import metrics
+
+from . import images
+from .models import Post
+from .page_cache import invalidate_post
+
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+logger = logging.getLogger(__name__)
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def generate_thumbnail(post_id):
+    """Строит миниатюру и варианты картинки и сохраняет их адреса в посте."""
+    post = Post.objects.select_related('author').filter(pk=post_id).first()
+    if post is None or not post.image:
+        return None
+    started = time.perf_counter()
+    thumbnail = get_thumbnail(post.image, GEOMETRY, **OPTIONS)
+    variants = images.build_variants(post.image)
+    metrics.observe('yatube_thumbnail_duration_seconds',
+                    time.perf_counter() - started)
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnail=thumbnail.url, variants=images.dumps(variants),
+        version=F('version') + 1)
+    if updated:
+        invalidate_post(post)
+    return thumbnail.url
+
+
+def _generate(post_id):
+    try:
+        generate_thumbnail(post_id)
+    except Exception:
+        logger.exception('Не удалось построить миниатюру поста %s', post_id)
+
+
+def _generate_in_worker(post_id):
+    try:
+        _generate(post_id)
+    finally:
+        connection.close()
+
+
+def schedule_thumbnail(post):
+    """Ставит построение миниатюры в очередь после коммита транзакции.
+
+    При THUMBNAIL_WORKERS = 0 миниатюра строится сразу после коммита.
+    """
+    if not settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: _generate(post.pk))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_generate_in_worker, post.pk))
@@ -0,0 +1,150 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+
+from core.routers import primary
+
+from .following import followed_ids
+from .models import AuthorStats, Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+RECENT_KEY = 'feed:recent:{}'
+RECENT_TIMEOUT = 60 * 5
+# Все посты автора во все ленты его подписчиков одним запросом; записи,
+# которые уже есть, пропускаются.
+BACKFILL_AUTHOR_SQL = f"""
+    INSERT OR IGNORE INTO {TimelineEntry._meta.db_table}
+        (user_id, post_id, author_id, pub_date)
+    SELECT follow.user_id, post.id, post.author_id, post.pub_date
+    FROM {Follow._meta.db_table} AS follow
+    JOIN {Post._meta.db_table} AS post ON post.author_id = follow.author_id
+    WHERE follow.author_id = %s
+"""
+
+
+def is_pulled(author_id):
+    """Посты авторов с большим числом подписчиков не раскладываются."""
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FEED_PULL_THRESHOLD,
+    ).exists()
+
+
+def pulled_authors(user):
+    authors = followed_ids(user.pk)
+    if not authors:
+        return []
+    return list(
+        AuthorStats.objects.filter(
+            user_id__in=authors,
+            followers_count__gt=settings.FEED_PULL_THRESHOLD,
+        ).values_list('user_id', flat=True)
+    )
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    forget_recent(post.author_id)
+    if is_pulled(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post.pk,
+                       author_id=post.author_id, pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def backfill_follow(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    if is_pulled(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id).values_list('pk', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=pk,
+                       author_id=author_id, pub_date=pub_date)
+         for pk, pub_date in posts.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_author(author_id):
+    """Раскладывает все посты автора по лентам всех его подписчиков."""
+    with connection.cursor() as cursor:
+        cursor.execute(BACKFILL_AUTHOR_SQL, [author_id])
+
+
+def author_unfollowed(author_id):
+    """Вызывается после уменьшения followers_count автора.
+
+    Пока автор был тяжёлым, его посты не раскладывались, а новые
+    подписчики не получали старых постов. Когда подписчиков становится
+    ровно порог, автор снова раскладывается, и ленты дозаполняются.
+    """
+    count = AuthorStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True).first()
+    if count == settings.FEED_PULL_THRESHOLD:
+        backfill_author(author_id)
+
+
+def drop_follow(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id=author_id).delete()
+
+
+def recent_posts(author_id):
+    """Последние посты автора как отсортированный список (pub_date, id)."""
+    key = RECENT_KEY.format(author_id)
+    recent = cache.get(key)
+    if recent is None:
+        with primary():
+            recent = list(
+                Post.objects.filter(author_id=author_id)
+                .order_by('-pub_date', '-id')
+                .values_list('pub_date', 'id')[:settings.FEED_MERGE_DEPTH]
+            )
+        cache.set(key, recent, RECENT_TIMEOUT)
+    return recent
+
+
+def forget_recent(author_id):
+    cache.delete(RECENT_KEY.format(author_id))
+
+
+def merged_post_ids(user, authors):
+    """Сливает раскладанную ленту с последними постами тяжёлых авторов."""
+    depth = settings.FEED_MERGE_DEPTH
+    pushed = (
+        TimelineEntry.objects.filter(user=user)
+        .order_by('-pub_date', '-post')
+        .values_list('pub_date', 'post_id')[:depth]
+    )
+    streams = [list(pushed)] + [recent_posts(pk) for pk in authors]
+    seen = set()
+    merged = (
+        pk for _, pk in heapq.merge(*streams, reverse=True)
+        if not (pk in seen or seen.add(pk))
+    )
+    return list(islice(merged, depth))
+
+
+def timeline_posts(user):
+    """Лента подписок и ключи для её постраничного вывода."""
+    authors = pulled_authors(user)
+    if authors:
+        posts = Post.objects.filter(pk__in=merged_post_ids(user, authors))
+        return posts, ('pub_date', 'id')
+    posts = Post.objects.filter(timeline_entries__user=user).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_id=F('timeline_entries__post_id'),
+    )
+    return posts, ('feed_date', 'feed_id')
@@ -1,39 +1,66 @@
-from django.views.decorators.cache import cache_page
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.views.decorators.http import condition
+
+from core.routers import primary
+
+from . import conditional, counters, export, following, live, search
 from .models import Post, Group, Follow
 from .forms import PostForm, CommentForm
+from .page_cache import cache_feed
+from .paginators import CursorPaginator, cursor_id, forward_page
+from .thumbnails import schedule_thumbnail
+from .timeline import timeline_posts
 
 POST_CUT = 10
+COMMENT_CUT = 20
 User = get_user_model()
 
 
-def paginate_posts(posts, num_posts, request):
-    paginator = Paginator(posts, num_posts)
+def paginate_posts(posts, num_posts, request, **kwargs):
+    paginator = CursorPaginator(posts, num_posts, **kwargs)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return paginator.cursor_page(cursor)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
-@cache_page(20 * 1, key_prefix='index_page')
+def live_since(page_obj):
+    """С какого поста считать новые: только для первой страницы ленты."""
+    if page_obj.number != 1:
+        return None
+    return max((post.pk for post in page_obj), default=0)
+
+
+@cache_feed('index')
 def index(request):
     title = 'Последнее обновление на сайте'
-    posts = Post.objects.all()
+    posts = Post.objects.for_feed()
     page_obj = paginate_posts(posts, POST_CUT, request)
     context = {
         'title': title,
         'posts': posts,
         'page_obj': page_obj,
+        'live_since': live_since(page_obj),
+        'live_stream': settings.LIVE_STREAM,
+        'live_interval': settings.LIVE_CLIENT_INTERVAL,
     }
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=conditional.group_etag)
+@cache_feed('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     title = f'Записи сообщества {group.title} | Yatube'
-    posts = group.posts.all()
+    posts = group.posts.for_feed()
     page_obj = paginate_posts(posts, POST_CUT, request)
     context = {
         'title': title,
@@ -43,37 +70,95 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=conditional.profile_etag)
+@cache_feed('profile:{username}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts_author = author.posts.all()
-    count = posts_author.count()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    posts_author = author.posts.for_feed()
+    count = counters.posts_count(author)
     page_obj = paginate_posts(posts_author, POST_CUT, request)
-    following = request.user.is_authenticated and (
-        Follow.objects.filter(
-            user=request.user, author=author).exists())
+    is_following = request.user.is_authenticated and (
+        following.is_following(request.user.pk, author.pk))
     context = {
         'author': author,
         'posts_author': posts_author,
         'count': count,
         'page_obj': page_obj,
-        'following': following,
+        'following': is_following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@condition(etag_func=conditional.post_etag)
+@primary()
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id)
+    comments, next_cursor = forward_page(
+        post.comments.select_related('author'), COMMENT_CUT,
+        request.GET.get('cursor'))
     form = CommentForm()
     context = {
         'post': post,
         'comments': comments,
+        'next_cursor': next_cursor,
         'form': form,
-
+        'posts_count': counters.posts_count(post.author),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    comments, next_cursor = forward_page(
+        post.comments.select_related('author'), COMMENT_CUT,
+        request.GET.get('cursor'))
+    context = {
+        'post': post,
+        'comments': comments,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    posts, next_cursor = search.search(
+        query, POST_CUT, request.GET.get('cursor'))
+    context = {
+        'title': f'Поиск: {query}' if query else 'Поиск',
+        'query': query,
+        'posts': posts,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@condition(etag_func=conditional.live_etag)
+@primary()
+def live_posts(request):
+    """Число новых постов: JSON для опроса или поток SSE (LIVE_STREAM)."""
+    try:
+        since = cursor_id(request.GET.get('since', ''))
+    except ValueError:
+        since = live.latest_id()
+    user_id = None
+    if request.GET.get('feed') == 'follow':
+        if not request.user.is_authenticated:
+            raise PermissionDenied
+        user_id = request.user.pk
+    if not settings.LIVE_STREAM:
+        response = JsonResponse(live.snapshot(since, user_id))
+        response['Cache-Control'] = 'no-cache'
+        return response
+    response = StreamingHttpResponse(
+        live.events(since, user_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -81,6 +166,8 @@ def post_create(request):
         create_post = form.save(commit=False)
         create_post.author = request.user
         create_post.save()
+        if create_post.image:
+            schedule_thumbnail(create_post)
         return redirect('posts:profile', create_post.author)
     context = {
         'form': form
@@ -96,8 +183,17 @@ def post_edit(request, post_id):
                         files=request.FILES or None, instance=post)
         if form.is_valid():
             post = form.save(commit=False)
-            post.author = request.user
-            post.save()
+            # Сохраняются только поля формы: comments_count и version
+            # меняются параллельно через F(), их нельзя перезаписывать
+            # значениями, прочитанными в начале запроса.
+            fields = ['version', *form.changed_data]
+            post.version = F('version')
+            if 'image' in form.changed_data:
+                post.thumbnail = post.variants = ''
+                fields += ['thumbnail', 'variants']
+            post.save(update_fields=fields)
+            if 'image' in form.changed_data and post.image:
+                schedule_thumbnail(post)
             return redirect('posts:post_detail', post_id=post.id)
         context = {
             'post': post,
@@ -122,14 +218,35 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginate_posts(posts, POST_CUT, request)
+    posts, keys = timeline_posts(request.user)
+    page_obj = paginate_posts(posts.for_feed(), POST_CUT, request, keys=keys)
     context = {
         'page_obj': page_obj,
+        'live_since': live_since(page_obj),
+        'live_stream': settings.LIVE_STREAM,
+        'live_interval': settings.LIVE_CLIENT_INTERVAL,
     }
     return render(request, 'posts/follow.html', context)
 
 
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        raise PermissionDenied
+    kind = request.GET.get('kind', 'posts')
+    fmt = request.GET.get('format', 'csv')
+    if kind not in export.KINDS or fmt not in export.FORMATS:
+        kind, fmt = 'posts', 'csv'
+    response = StreamingHttpResponse(
+        export.stream(kind, fmt, export.select(kind, author=author)),
+        content_type=export.CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{kind}-{author.pk}.{fmt}"')
+    return response
+
+
 @login_required
 def profile_follow(request, username):
     user = get_object_or_404(User, username=username)
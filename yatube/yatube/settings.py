@@ -10,11 +10,24 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Файлы, которые пишутся во время работы (кэш, метрики). Тесты получают
+# свой временный каталог: не делят кэш с запущенным сайтом и не мусорят
+# в дереве проекта.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+RUNTIME_DIR = BASE_DIR
+if TESTING:
+    RUNTIME_DIR = tempfile.mkdtemp(prefix='yatube-')
+    atexit.register(shutil.rmtree, RUNTIME_DIR, True)
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
@@ -53,7 +66,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.TemplateTimingMiddleware',
+    'core.middleware.SamplingProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,11 +102,74 @@ TEMPLATES = [
     }
 ]
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Кэш общий для всех процессов машины: файл SQLite (core.cache), иначе
+# каждый воркер держит свою копию страниц и не видит их сброса.
+# YATUBE_CACHE=locmem -- кэш в памяти процесса, YATUBE_CACHE_PATH -- файл.
+if os.environ.get('YATUBE_CACHE') == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': os.environ.get(
+                'YATUBE_CACHE_PATH',
+                os.path.join(RUNTIME_DIR, 'cache', 'cache.sqlite3')),
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+
+# Лента подписок: посты авторов, у которых подписчиков больше порога,
+# не раскладываются по лентам, а подмешиваются при чтении.
+FEED_PULL_THRESHOLD = 1000
+FEED_MERGE_DEPTH = 200
+
+# Ленты кэшируются надолго: сигналы сбрасывают их при изменении постов.
+FEED_PAGE_TIMEOUT = 60 * 60
+
+# Плашка новых постов опрашивает live/ раз в LIVE_CLIENT_INTERVAL секунд
+# коротким запросом: пока постов нет, ответ -- 304 без похода в базу.
+# LIVE_STREAM включает поток SSE вместо опроса. Каждое соединение держит
+# воркер до LIVE_STREAM_TIMEOUT секунд и проверяет кэш раз в
+# LIVE_POLL_INTERVAL, поэтому поток -- только для асинхронных или
+# многопоточных воркеров (gunicorn -k gevent / gthread), синхронный пул
+# он выберет за несколько открытых вкладок. Новые посты видны между
+# процессами через общий кэш; с YATUBE_CACHE=locmem -- только в своём.
+LIVE_CLIENT_INTERVAL = 30
+LIVE_STREAM = False
+LIVE_POLL_INTERVAL = 2
+LIVE_STREAM_TIMEOUT = 55
+
+# Загруженные картинки ужимаются до IMAGE_MAX_SIDE по длинной стороне;
+# для srcset заранее строятся варианты такой ширины.
+IMAGE_MAX_SIDE = 2048
+IMAGE_VARIANT_WIDTHS = (480, 960, 1440)
+
+# Число потоков, которые заранее строят миниатюры загруженных картинок.
+# 0 -- строить сразу после коммита в потоке запроса: так в тестах поток
+# не пишет в базу параллельно с её очисткой.
+THUMBNAIL_WORKERS = 0 if TESTING else 2
+
+# Профилирование запросов cProfile (core.middleware): доля случайных
+# запросов и секрет для заголовка X-Profile. По умолчанию выключено.
+PROFILER_SAMPLE_RATE = 0.0
+PROFILER_SECRET = ''
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILER_MAX_FILES = 200
+
+# Метрики Prometheus (/metrics): воркеры копят их в памяти и раз в
+# METRICS_FLUSH_INTERVAL секунд складывают в общий файл METRICS_DB.
+METRICS_ENABLED = True
+METRICS_DB = os.path.join(RUNTIME_DIR, 'metrics', 'metrics.sqlite3')
+METRICS_FLUSH_INTERVAL = 5
+
+# Замеры рендера шаблонов и перечисленных тегов (core.template_timing):
+# заголовок Server-Timing и метрики. Включать на время разбора.
+TEMPLATE_TIMING = False
+TEMPLATE_TIMING_TAGS = ('include', 'postcache', 'thumbnail')
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
@@ -104,6 +184,32 @@ DATABASES = {
     }
 }
 
+# PRAGMA для каждого нового соединения SQLite (core.signals). WAL даёт
+# читать во время записи, busy_timeout -- ждать блокировку, а не падать
+# с «database is locked»; synchronous=NORMAL в WAL не теряет целостность.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Реплики только для чтения лент и постов (core.routers.ReplicaRouter).
+# Локально: YATUBE_REPLICA_DB -- путь ко второму файлу SQLite, который
+# обновляет manage.py sync_replica.
+DATABASE_REPLICAS = []
+REPLICA_STICKY_SECONDS = 5
+if os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['YATUBE_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators